@@ -0,0 +1,43 @@
+import os
+import numpy as np
+
+class ActivityModel:
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(
+                arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                arrays["value"], arrays["roots"], arrays["max_depth"]
+            )
+
+    def predict_proba(self, samples):
+        # samples: (n_samples, n_features) -> positive-class probability per sample
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples[np.newaxis, :]
+        rows = np.arange(samples.shape[0])[:, np.newaxis]
+        # Walk all trees for all samples at once; leaves loop back on themselves
+        nodes = np.broadcast_to(self.roots, (samples.shape[0], self.roots.shape[0])).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            goes_left = samples[rows, np.maximum(feature, 0)] <= self.threshold[nodes]
+            nodes = np.where(goes_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, samples, cutoff=0.5):
+        return self.predict_proba(samples) >= cutoff
+
+def load_activity_model(path):
+    # The model is optional: without an exported forest the tracker falls back to thresholds
+    if not os.path.exists(path):
+        return None
+    return ActivityModel.load(path)
@@ -13,12 +13,18 @@ import threading
 import win32con
 import win32event
 import win32file
-import cProfile  # Add import for cProfile
-import pstats  # Add import for pstats
+from collections import deque
+from .activity_model import load_activity_model
+from .window_inventory import WindowInventory
+from .process_resolver import ProcessResolver
+from .sampling_profiler import SamplingProfiler
+from .process_tree import ProcessTree
+from .baseline_store import BaselineStore, identity_key
 
 DATA_FILE = FILE_PATHS["DATA_FILE"]
 SETTINGS_FILE = FILE_PATHS["SETTINGS_FILE"]
 DEBUG_FILE = FILE_PATHS["DEBUG_FILE"]
+MODEL_FILE = FILE_PATHS["MODEL_FILE"]
 
 # ✅ Initialize Session Data
 def load_session_data():
@@ -28,26 +34,29 @@ def load_session_data():
     return {}
 
 def save_session_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f)
+    # Replace the file atomically so concurrent readers (query API, merge tools) never see a partial write
+    temp_file = f"{DATA_FILE}.{threading.get_ident()}.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(data, f, default=dict)  # data may be a read-only snapshot (MappingProxyType)
+    os.replace(temp_file, DATA_FILE)
 
 # Initialize the utilities class
 class AppTrackerUtilities:
     def __init__(self):
         self.log_lock = threading.Lock()  # Add a lock for thread-safe logging
         self.activity_lock = threading.Lock()  # Add a lock for thread-safe activity score calculations
-        self.stop_event = threading.Event()  # Event to signal stopping the monitoring
-        self.profiler = cProfile.Profile()  # Add a profiler instance
-        self.profiler.enable()  # Enable profiling
-        self.active_apps = {}
+        self.profiler = SamplingProfiler(FILE_PATHS["PROFILE_FILE"])  # Idle until start_profiling()
         self.current_app = None
         self.user_active = False
         self.last_active_time = time.time()
-        self.app_name_cache = {}
+        self.process_resolver = ProcessResolver(version_info=self.get_file_version_info if settings.get("resolve_version_info", False) else None)
         self.debug_logs = []
+        self.debug_log_count = 0  # Total entries ever logged, lets readers find lines added since they last looked
         self.baseline = {}
         self.resource_usage = {}
         self.thresholds = {}
+        self.baseline_store = BaselineStore(FILE_PATHS["BASELINE_FILE"])  # Learned state per executable, across restarts
+        self.baseline_keys = {}  # pid -> baseline store key of the executable it was seen running
         self.tracker_pid = None  # Add a variable to store the tracker's PID
         self.active_pids = set()  # Add a set to store active PIDs
         self.known_active_apps = {}  # Add a dictionary to store known active applications
@@ -59,24 +68,44 @@ class AppTrackerUtilities:
         self.aggregated_data = {}        # Dictionary to store aggregated CPU and I/O data
         self.foreground_weight = 2.0  # Weight for foreground applications
         self.background_weight = 1.0  # Weight for background applications
-        self.cpu_threshold = 5.0  # CPU usage threshold percentage
-        self.io_threshold = 1048576  # I/O usage threshold in bytes (1 MB)
+        self.cpu_threshold = settings.get("cpu_threshold", 5.0)  # CPU usage threshold percentage
+        self.io_threshold = settings.get("io_threshold", 1048576)  # I/O usage threshold in bytes (1 MB)
         self.top_n = 5  # Number of top apps to focus detailed tracking on
         self.top_apps = []  # List to store top N apps
         logging.basicConfig(filename=DEBUG_FILE, level=logging.DEBUG, format='%(asctime)s %(message)s')
         self.log_debug("AppTrackerUtilities initialized.")
         self.cache = {}  # Cache to store recent values
+        self.process_tree = ProcessTree()  # CPU and I/O of helper processes count towards the app that owns them
+        self.io_rates = {}  # pid -> latest I/O rate in bytes per second, over the app's whole process tree
         self.batch_size = 10  # Batch size for processing
         self.batch_data = []  # List to store batch data
         self.inactivity_timeout = settings.get("inactivity_timeout", 300)  # Default to 300 seconds if not set
-
-    def save_profile_stats(self):
-        self.profiler.disable()
-        with open("app_tracker_profile_stats.txt", "w") as f:
-            ps = pstats.Stats(self.profiler, stream=f)
-            ps.sort_stats(pstats.SortKey.CUMULATIVE)
-            ps.print_stats()
-        # Do not re-enable the profiler here
+        settings.subscribe(self.apply_settings, ["inactivity_timeout", "cpu_threshold", "io_threshold", "profiling_enabled"])
+        if settings.get("profiling_enabled", False):
+            self.start_profiling()
+        self.interaction_times = deque(maxlen=1000)  # Timestamps of recent keyboard/mouse events
+        self.input_listeners = []
+        self.interaction_window = 5.0  # Window in seconds used for the user_interactions feature
+        self.video_cutoff = 0.5  # Model probability above which an app counts as passively active
+        self.window_inventory = WindowInventory(self.enumerate_open_windows)  # Refreshed by log_all_open_windows
+        self.activity_model = load_activity_model(MODEL_FILE)  # Flattened forest exported by ml_model.py
+        if self.activity_model is None:
+            self.log_debug("No activity model found, using resource thresholds only.")
+
+    def apply_settings(self, changes):
+        # Called by the settings store whenever one of the live-tunable values changes
+        if "inactivity_timeout" in changes:
+            self.inactivity_timeout = changes["inactivity_timeout"]
+        if "cpu_threshold" in changes:
+            self.cpu_threshold = changes["cpu_threshold"]
+        if "io_threshold" in changes:
+            self.io_threshold = changes["io_threshold"]
+        if "profiling_enabled" in changes:
+            if changes["profiling_enabled"]:
+                self.start_profiling()
+            else:
+                self.stop_profiling()
+        self.log_debug(f"Applied settings: {changes}")
 
     def log_debug(self, message, error=False):
         with self.log_lock:  # Ensure thread-safe logging
@@ -85,23 +114,34 @@ class AppTrackerUtilities:
             else:
                 logging.debug(message)
             self.debug_logs.append(message)
+            self.debug_log_count += 1
             if len(self.debug_logs) > 1000:  # Limit the log size
                 self.debug_logs.pop(0)
-        self.save_profile_stats()  # Save profiling stats after logging
 
-    def stop_profiling(self):
-        self.save_profile_stats()  # Save profiling stats before stopping
-        self.profiler.disable()  # Disable profiling
+    def start_profiling(self):
+        if not self.profiler.running:
+            self.profiler.start()
+            self.log_debug("Sampling profiler started.")
 
-    def get_friendly_app_name(self, process):
+    def stop_profiling(self):
+        # Writes collapsed stacks (flamegraph.pl / speedscope input); no-op when not profiling
+        path = self.profiler.stop()
+        if path:
+            self.log_debug(f"Sampling profiler stopped after {self.profiler.samples} samples, stacks written to {path}")
+        return path
+
+    def get_file_version_info(self, exe_path):
+        # Returns (description, version) from the executable's version resource, or (None, None)
         try:
-            # Try to get the executable path and derive the friendly name
-            exe_path = process.exe()
-            friendly_name = os.path.basename(exe_path).rsplit('.', 1)[0]
-            return friendly_name
-        except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
-            # Fallback to process name if exe path is not accessible
-            return process.name().rsplit('.', 1)[0]
+            lang, codepage = win32api.GetFileVersionInfo(exe_path, "\\VarFileInfo\\Translation")[0]
+            description = win32api.GetFileVersionInfo(exe_path, f"\\StringFileInfo\\{lang:04X}{codepage:04X}\\FileDescription")
+            fixed = win32api.GetFileVersionInfo(exe_path, "\\")
+            ms, ls = fixed["FileVersionMS"], fixed["FileVersionLS"]
+            version = f"{win32api.HIWORD(ms)}.{win32api.LOWORD(ms)}.{win32api.HIWORD(ls)}.{win32api.LOWORD(ls)}"
+            return description, version
+        except Exception as e:
+            self.log_debug(f"No version info for {exe_path}: {e}")
+            return None, None
 
     def set_tracker_pid(self, pid):
         self.tracker_pid = pid
@@ -118,25 +158,96 @@ class AppTrackerUtilities:
         self.active_pids.add(pid)  # Add the PID to the active PIDs set
         self.known_active_apps[pid] = time.time()  # Update the known active applications
         self.log_debug(f"Foreground window handle: {hwnd}, PID: {pid}")
-        try:
-            process = psutil.Process(pid)
-            friendly_app_name = self.get_friendly_app_name(process)
-            window_title = win32gui.GetWindowText(hwnd)
-            self.log_debug(f"Active window detected: {friendly_app_name} - {window_title}")
-            return friendly_app_name, pid, window_title
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-            self.log_debug(f"Error detecting active window: {e}", error=True)
+        identity = self.process_resolver.resolve(pid, hwnd)
+        if identity is None:
+            self.log_debug(f"Error detecting active window: cannot resolve PID {pid}", error=True)
             return None, None, None
+        self.warm_start(pid, identity)
+        window_title = win32gui.GetWindowText(hwnd)
+        self.log_debug(f"Active window detected: {identity.friendly_name} - {window_title}")
+        return identity.friendly_name, pid, window_title
+
+    def warm_start(self, pid, identity):
+        # First sight of a process: seed its scoring state from what was learned for the same executable
+        key = identity_key(identity)
+        if self.baseline_keys.get(pid) == key:
+            return
+        entry = self.baseline_store.get(key)
+        with self.activity_lock:
+            self.baseline_keys[pid] = key
+            # Drop anything left from an earlier process with the same PID
+            self.baseline.pop(pid, None)
+            self.thresholds.pop(pid, None)
+            self.sampling_intervals.pop(pid, None)
+            if entry:
+                if entry.get("cpu"):
+                    self.baseline[pid] = {"cpu": list(entry["cpu"]), "io": list(entry["io"])}
+                if entry.get("thresholds"):
+                    self.thresholds[pid] = dict(entry["thresholds"])
+                if entry.get("interval"):
+                    self.sampling_intervals[pid] = entry["interval"]
+        if entry:
+            self.log_debug(f"Warm start for PID {pid} from learned state of {key}")
+
+    def save_baselines(self):
+        # Called periodically by the tracker; returns True if the store was written
+        with self.activity_lock:
+            for pid, key in self.baseline_keys.items():
+                if pid not in self.baseline and pid not in self.thresholds and pid not in self.sampling_intervals:
+                    continue
+                baseline = self.baseline.get(pid, {"cpu": [], "io": []})
+                entry = {
+                    "cpu": [round(value, 3) for value in baseline["cpu"]],
+                    "io": [round(value, 3) for value in baseline["io"]],
+                    "thresholds": {name: round(value, 3) for name, value in self.thresholds.get(pid, {}).items()},
+                    "interval": self.sampling_intervals.get(pid)
+                }
+                self.baseline_store.put(key, entry)
+        # What exited processes learned is in the store now; their per-PID state can go
+        tracked = set(self.baseline_keys) | set(self.cache) | set(self.aggregated_data) | set(self.io_rates)
+        for pid in tracked:
+            if not psutil.pid_exists(pid):
+                self.forget_process(pid)
+        try:
+            return self.baseline_store.flush()
+        except OSError as e:
+            self.log_debug(f"Error saving learned baselines: {e}", error=True)
+            return False
 
-    def log_all_open_windows(self):
+    def forget_process(self, pid):
+        with self.activity_lock:
+            self.baseline_keys.pop(pid, None)
+            self.baseline.pop(pid, None)
+            self.thresholds.pop(pid, None)
+            self.sampling_intervals.pop(pid, None)
+            self.cache.pop(pid, None)
+            self.aggregated_data.pop(pid, None)
+            self.io_rates.pop(pid, None)
+            self.active_pids.discard(pid)
+
+    def enumerate_open_windows(self):
         def enum_window_callback(hwnd, results):
             if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
                 _, pid = win32process.GetWindowThreadProcessId(hwnd)
                 results.append((hwnd, pid, win32gui.GetWindowText(hwnd)))
         results = []
         win32gui.EnumWindows(enum_window_callback, results)
-        for hwnd, pid, title in results:
-            self.log_debug(f"Open window: hwnd={hwnd}, pid={pid}, title={title}")
+        return results
+
+    def log_all_open_windows(self):
+        # Only changes since the previous refresh are logged
+        first_refresh = not self.window_inventory.populated
+        opened, closed, retitled = self.window_inventory.refresh()
+        if first_refresh:
+            self.log_debug(f"Window inventory: {len(self.window_inventory)} open windows")
+            return
+        for hwnd, pid, title in opened:
+            self.log_debug(f"Window opened: hwnd={hwnd}, pid={pid}, title={title}")
+        for hwnd, pid, title in closed:
+            self.process_resolver.forget_window(hwnd)
+            self.log_debug(f"Window closed: hwnd={hwnd}, pid={pid}, title={title}")
+        for hwnd, pid, old_title, new_title in retitled:
+            self.log_debug(f"Window retitled: hwnd={hwnd}, pid={pid}, title={old_title} -> {new_title}")
 
     def categorize_activity(self, window_title):
         # Example categorization logic based on window title
@@ -187,7 +298,7 @@ class AppTrackerUtilities:
         return None, None
 
     def cache_metrics(self, pid, cpu_usage, io_usage):
-        self.cache[pid] = (cpu_usage, io_usage)
+        self.cache[pid] = (cpu_usage, io_usage, time.time())
         self.log_debug(f"Cached metrics for PID {pid}: CPU={cpu_usage}%, IO={io_usage} bytes")
 
     def process_batch_data(self):
@@ -198,23 +309,33 @@ class AppTrackerUtilities:
             self.log_debug("Processed batch data")
 
     def get_app_resource_usage(self, pid):
-        try:
-            if pid in self.cache:
-                cpu_usage, io_usage = self.cache[pid]
+        return self.get_apps_resource_usage([pid]).get(pid, (None, None))
+
+    def get_apps_resource_usage(self, pids):
+        # pid -> aggregated (cpu, io) rolled up over each app's process tree in one pass;
+        # PIDs whose process is gone or inaccessible are left out
+        current_time = time.time()
+        stale = [pid for pid in pids if pid not in self.cache or current_time - self.cache[pid][2] >= self.get_sampling_interval(pid)]
+        # New apps are primed and sampled again after a single shared one-second wait
+        usage = self.process_tree.usage(stale, wait=1.0, exclude=(self.tracker_pid,)) if stale else {}
+        results = {}
+        for pid in pids:
+            if pid in usage:
+                app_usage = usage[pid]
+                cpu_usage, io_usage = app_usage.cpu_percent, app_usage.io_bytes
+                self.cache_metrics(pid, cpu_usage, io_usage)
+                self.io_rates[pid] = app_usage.io_rate
+                self.log_debug(f"Raw resource usage for PID {pid} ({app_usage.processes} processes): CPU={cpu_usage}%, IO={io_usage} bytes")
+            elif pid not in stale:
+                cpu_usage, io_usage, _ = self.cache[pid]
                 self.log_debug(f"Using cached resource usage for PID {pid}: CPU={cpu_usage}%, IO={io_usage} bytes")
             else:
-                process = psutil.Process(pid)
-                cpu_usage = process.cpu_percent(interval=1)
-                io_counters = process.io_counters()
-                io_usage = io_counters.read_bytes + io_counters.write_bytes
-                self.cache_metrics(pid, cpu_usage, io_usage)
-                self.log_debug(f"Raw resource usage for PID {pid}: CPU={cpu_usage}%, IO={io_usage} bytes")
+                self.log_debug(f"Error getting resource usage for PID {pid}: process is gone or access denied", error=True)
+                continue
             self.batch_data.append((pid, cpu_usage, io_usage))
             self.process_batch_data()
-            return self.aggregate_metrics(pid, cpu_usage, io_usage)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-            self.log_debug(f"Error getting resource usage for PID {pid}: {e}", error=True)
-            return None, None
+            results[pid] = self.aggregate_metrics(pid, cpu_usage, io_usage)
+        return results
 
     def update_thresholds(self, pid, avg_cpu, avg_io):
         if pid not in self.thresholds:
@@ -273,32 +394,76 @@ class AppTrackerUtilities:
             return score
 
     def check_background_activity(self):
+        samples = {}
+        pids = []
         for pid in list(self.known_active_apps.keys()):
             if pid == self.tracker_pid:
                 continue
-            cpu_usage, io_usage = self.get_app_resource_usage(pid)
+            # Kept even without a visible window: tray apps and minimized players still count
+            pids.append(pid)
+        usage = self.get_apps_resource_usage(pids)
+        for pid in pids:
+            if pid not in usage:
+                # Missing usage may only mean access was denied; forget the PID once its process
+                # exited. A PID with windows in the inventory is still running, so it needs no lookup.
+                if not self.window_inventory.has_windows(pid) and not psutil.pid_exists(pid):
+                    del self.known_active_apps[pid]
+                    self.forget_process(pid)
+                continue
+            cpu_usage, io_usage = usage[pid]
             if cpu_usage is not None and io_usage is not None:
+                samples[pid] = (cpu_usage, self.io_rates.get(pid, 0.0), False)
                 score = self.calculate_activity_score(pid, cpu_usage, io_usage, False)
                 if score >= 2:
                     self.log_debug(f"Background activity detected for PID {pid}: score={score}")
                     return True
-            else:
-                # Remove the PID from known active apps if the process no longer exists
-                del self.known_active_apps[pid]
+        # Score all remaining PIDs in one batch so passive video playback still counts
+        video_pids = self.score_video_activity(samples)
+        if video_pids:
+            self.log_debug(f"Video activity detected for PIDs {sorted(video_pids)}")
+            return True
         return False
 
+    def record_interaction(self):
+        current_time = time.time()
+        self.last_active_time = current_time
+        self.interaction_times.append(current_time)
+        for listener in self.input_listeners:
+            listener()
+
+    def add_input_listener(self, listener):
+        # listener() is called from the keyboard/mouse hook threads and must return quickly
+        self.input_listeners.append(listener)
+
+    def recent_interactions(self):
+        cutoff = time.time() - self.interaction_window
+        return sum(1 for t in self.interaction_times if t >= cutoff)
+
+    def score_video_activity(self, samples):
+        # samples: {pid: (cpu_usage, io_rate, is_foreground)} -> set of PIDs the model considers passively active
+        if self.activity_model is None or not samples:
+            return set()
+        pids = list(samples.keys())
+        interactions = self.recent_interactions()
+        features = [(cpu_usage, io_rate, interactions, 1 if is_foreground else 0) for cpu_usage, io_rate, is_foreground in samples.values()]
+        predictions = self.activity_model.predict(features, self.video_cutoff)
+        return {pid for pid, active in zip(pids, predictions) if active}
+
     def is_application_active(self, pid, is_foreground):
         cpu_usage, io_usage = self.get_app_resource_usage(pid)
         if cpu_usage is None or io_usage is None:
             return False
+        if pid in self.score_video_activity({pid: (cpu_usage, self.io_rates.get(pid, 0.0), is_foreground)}):
+            self.log_debug(f"Video activity detected for PID {pid}")
+            return True
         score = self.calculate_activity_score(pid, cpu_usage, io_usage, is_foreground)
         self.log_debug(f"Activity score for PID {pid}: {score}")
         if score >= 2:
             return True
         return self.check_background_activity()
 
-    def monitor_file_changes(self, directory):
-        change_handle = win32file.FindFirstChangeNotification(
+    def open_change_notification(self, directory):
+        return win32file.FindFirstChangeNotification(
             directory,
             0,
             win32con.FILE_NOTIFY_CHANGE_FILE_NAME |
@@ -308,21 +473,17 @@ class AppTrackerUtilities:
             win32con.FILE_NOTIFY_CHANGE_LAST_WRITE |
             win32con.FILE_NOTIFY_CHANGE_SECURITY
         )
-        try:
-            while not self.stop_event.is_set():
-                result = win32event.WaitForSingleObject(change_handle, 500)
-                if result == win32con.WAIT_OBJECT_0:
-                    self.log_debug(f"Change detected in directory: {directory}")
-                    win32file.FindNextChangeNotification(change_handle)
-        finally:
-            win32file.FindCloseChangeNotification(change_handle)
 
-    def start_monitoring(self, directory):
-        self.stop_event.clear()
-        threading.Thread(target=self.monitor_file_changes, args=(directory,)).start()
+    def wait_for_change(self, change_handle, timeout_ms):
+        # Blocks for at most timeout_ms; returns True if a change was signalled
+        result = win32event.WaitForSingleObject(change_handle, timeout_ms)
+        if result == win32con.WAIT_OBJECT_0:
+            win32file.FindNextChangeNotification(change_handle)
+            return True
+        return False
 
-    def stop_monitoring(self):
-        self.stop_event.set()
+    def close_change_notification(self, change_handle):
+        win32file.FindCloseChangeNotification(change_handle)
 
     def update_user_activity(self):
         current_time = time.time()
@@ -335,5 +496,4 @@ class AppTrackerUtilities:
 
 app_tracker_utils = AppTrackerUtilities()
 
-app_tracker_utils.active_apps = load_session_data()
 
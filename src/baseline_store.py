@@ -0,0 +1,63 @@
+import os
+import json
+import time
+import threading
+
+def identity_key(identity):
+    # Learned state belongs to the executable, not to a PID that changes on every launch
+    if identity.exe_path:
+        return os.path.normcase(identity.exe_path)
+    return f"name:{identity.friendly_name}"
+
+class BaselineStore:
+    # Warm-start cache of learned scoring state per executable:
+    #   key -> {"cpu": [...], "io": [...], "thresholds": {"cpu": x, "io": y}, "interval": seconds, "seen": epoch}
+    # The file is read on first use and written only when an entry changed.
+    def __init__(self, path, max_entries=500):
+        self.path = path
+        self.max_entries = max_entries  # Least recently seen executables are dropped beyond this
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def get(self, key):
+        # A lookup is a use: an executable that is started often but never changes stays recent
+        with self.lock:
+            entry = self.load().get(key)
+            if entry is not None:
+                entry["seen"] = int(time.time())
+                self.dirty = True
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            stored = self.load().get(key)
+            if stored is not None and {k: v for k, v in stored.items() if k != "seen"} == entry:
+                return
+            self.entries[key] = dict(entry, seen=int(time.time()))
+            self.dirty = True
+
+    def flush(self):
+        # Returns True if the file was written
+        with self.lock:
+            if not self.dirty:
+                return False
+            if len(self.entries) > self.max_entries:
+                newest = sorted(self.entries.items(), key=lambda item: item[1].get("seen", 0), reverse=True)
+                self.entries = dict(newest[:self.max_entries])
+            data = json.dumps(self.entries, separators=(",", ":"))
+            self.dirty = False
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_file, self.path)
+        return True
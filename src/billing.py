@@ -0,0 +1,143 @@
+import argparse
+import json
+import math
+from collections.abc import Mapping
+
+def round_seconds(seconds, rounding):
+    # rounding: None or {"increment_minutes": n, "mode": "up" | "down" | "nearest"}
+    if not rounding or seconds <= 0:
+        return seconds
+    increment = rounding.get("increment_minutes", 0) * 60
+    if increment <= 0:
+        return seconds
+    mode = rounding.get("mode", "up")
+    if mode == "up":
+        return math.ceil(seconds / increment) * increment
+    if mode == "down":
+        return math.floor(seconds / increment) * increment
+    return round(seconds / increment) * increment
+
+class BillingEngine:
+    # Bills raw tracked seconds per (category, app). Totals are maintained incrementally,
+    # so every selection or wage change is O(1) regardless of session size.
+    def __init__(self, apps, hourly_wage, category_rates=None, app_rates=None, rounding=None):
+        self.hourly_wage = hourly_wage
+        self.category_rates = category_rates or {}
+        self.app_rates = app_rates or {}
+        self.rounding = rounding
+        self.window_seconds = {}  # (category, app, window) -> seconds
+        self.app_seconds = {}  # (category, app) -> seconds over all windows
+        self.app_checked = {}  # (category, app) -> whole app selected
+        self.selected_windows = {}  # (category, app) -> set of individually selected windows
+        self.selected_window_seconds = {}  # (category, app) -> seconds of those windows
+        self.billed_seconds = {}  # (category, app) -> rounded seconds currently billed
+        self.default_rate_seconds = 0  # Billed seconds charged at the (changeable) hourly wage
+        self.custom_rate_amount = 0.0  # Amount billed at category/app specific rates
+        self.raw_seconds = 0
+        for category, app_times in apps.items():
+            for app, window_times in app_times.items():
+                if not isinstance(window_times, Mapping):
+                    continue
+                key = (category, app)
+                self.app_seconds[key] = 0
+                self.app_checked[key] = False
+                self.selected_windows[key] = set()
+                self.selected_window_seconds[key] = 0
+                self.billed_seconds[key] = 0
+                for window, seconds in window_times.items():
+                    self.window_seconds[(category, app, window)] = seconds
+                    self.app_seconds[key] += seconds
+
+    def rate_for(self, category, app):
+        # Returns None when the app is billed at the hourly wage
+        if app in self.app_rates:
+            return self.app_rates[app]
+        return self.category_rates.get(category)
+
+    def selected_seconds(self, key):
+        return self.app_seconds[key] if self.app_checked[key] else self.selected_window_seconds[key]
+
+    def refresh(self, key, old_raw):
+        new_raw = self.selected_seconds(key)
+        self.raw_seconds += new_raw - old_raw
+        billed = round_seconds(new_raw, self.rounding)
+        delta = billed - self.billed_seconds[key]
+        self.billed_seconds[key] = billed
+        rate = self.rate_for(*key)
+        if rate is None:
+            self.default_rate_seconds += delta
+        else:
+            self.custom_rate_amount += delta / 3600 * rate
+
+    def select_app(self, category, app, selected):
+        # Selecting or clearing a whole app also clears its individual window selections
+        key = (category, app)
+        old_raw = self.selected_seconds(key)
+        self.app_checked[key] = selected
+        self.selected_windows[key] = set()
+        self.selected_window_seconds[key] = 0
+        self.refresh(key, old_raw)
+
+    def select_window(self, category, app, window, selected):
+        key = (category, app)
+        windows = self.selected_windows[key]
+        if selected == (window in windows):
+            return
+        old_raw = self.selected_seconds(key)
+        seconds = self.window_seconds[(category, app, window)]
+        if selected:
+            windows.add(window)
+            self.selected_window_seconds[key] += seconds
+        else:
+            windows.discard(window)
+            self.selected_window_seconds[key] -= seconds
+        self.refresh(key, old_raw)
+
+    def select_all(self, selected=True):
+        for category, app in self.app_seconds:
+            self.select_app(category, app, selected)
+
+    def set_hourly_wage(self, hourly_wage):
+        self.hourly_wage = hourly_wage
+
+    def total_seconds(self):
+        return self.raw_seconds
+
+    def total_amount(self):
+        return self.default_rate_seconds / 3600 * self.hourly_wage + self.custom_rate_amount
+
+    def lines(self):
+        # Invoice lines for every app with selected time
+        result = []
+        for key, billed in self.billed_seconds.items():
+            if billed <= 0:
+                continue
+            rate = self.rate_for(*key)
+            rate = self.hourly_wage if rate is None else rate
+            result.append({
+                "category": key[0],
+                "app": key[1],
+                "seconds": self.selected_seconds(key),
+                "billed_seconds": billed,
+                "rate": rate,
+                "amount": billed / 3600 * rate
+            })
+        return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bill tracked time from a history file")
+    parser.add_argument("history", help="history.json to bill")
+    parser.add_argument("--wage", type=float, default=10, help="hourly wage for apps without a specific rate")
+    parser.add_argument("--rates", help="JSON file with optional category_rates, app_rates and rounding")
+    args = parser.parse_args()
+    with open(args.history, "r") as f:
+        history = json.load(f)
+    options = {}
+    if args.rates:
+        with open(args.rates, "r") as f:
+            options = json.load(f)
+    engine = BillingEngine(history, args.wage, options.get("category_rates"), options.get("app_rates"), options.get("rounding"))
+    engine.select_all()
+    for line in engine.lines():
+        print(f"{line['category']:<15} {line['app']:<30} {line['billed_seconds'] / 3600:8.2f}h x {line['rate']:8.2f} = {line['amount']:10.2f}")
+    print(f"Total: {engine.total_amount():.2f}")
@@ -0,0 +1,133 @@
+import time
+import threading
+import logging
+from collections import deque
+from multiprocessing.connection import Client
+from PyQt5.QtCore import QThread, pyqtSignal
+from .config import COLLECTOR_ADDRESS, load_collector_authkey
+from .collector_protocol import send_message, recv_message, decode_changes
+from .state_snapshot import EMPTY, freeze, replace_app
+
+class CollectorClient(QThread):
+    # Drop-in replacement for TrackerThread that mirrors the state of a collector daemon
+    update_status_signal = pyqtSignal(str)
+    update_list_signal = pyqtSignal(object)  # Read-only snapshot, as from TrackerThread
+    update_debug_signal = pyqtSignal(str)
+
+    def __init__(self, address=COLLECTOR_ADDRESS, authkey=None):
+        super().__init__()
+        self.address = address
+        self.authkey = authkey or load_collector_authkey()
+        self.running = True
+        self.conn = None
+        self.retry_interval = 2.0
+        self.apps = EMPTY  # Replaced, never changed, so the GUI can keep what it was sent
+        self.version = 0
+        self.status = ""
+        self.debug_tail = deque(maxlen=1000)
+        self.debug_lock = threading.Lock()  # The catch-up emit reads the tail from the GUI thread
+        self.ui_visible = True  # While False state is still mirrored but nothing is emitted
+
+    def run(self):
+        while self.running:
+            try:
+                self.conn = Client(self.address, authkey=self.authkey)
+            except OSError:
+                self.update_status_signal.emit("Waiting for collector...")
+                time.sleep(self.retry_interval)
+                continue
+            logging.info(f"Connected to collector at {self.address}")
+            try:
+                while self.running:
+                    self.handle_message(recv_message(self.conn))
+            except (EOFError, OSError, ValueError):
+                if self.running:
+                    logging.error("Lost connection to collector, reconnecting.")
+            finally:
+                self.conn.close()
+                self.conn = None
+
+    def handle_message(self, message):
+        kind = message[0]
+        if kind == "snapshot":
+            _, self.version, apps, status, debug_lines = message
+            self.apps = freeze(apps)
+            with self.debug_lock:
+                self.debug_tail.clear()
+                self.debug_tail.extend(debug_lines)
+            self.status = status
+            self.emit_all()
+        elif kind == "delta":
+            _, self.version, rows = message
+            changes = decode_changes(rows)
+            by_app = {}
+            for (category, app, window_title), seconds in changes.items():
+                by_app.setdefault((category, app), []).append((window_title, seconds))
+            apps = self.apps
+            for (category, app), windows in by_app.items():
+                window_times = dict(apps.get(category, EMPTY).get(app, EMPTY))
+                for window_title, seconds in windows:
+                    if seconds is None:
+                        window_times.pop(window_title, None)
+                    else:
+                        window_times[window_title] = seconds
+                apps = replace_app(apps, category, app, window_times)
+            self.apps = apps
+            if self.ui_visible:
+                self.update_list_signal.emit(self.apps)
+        elif kind == "reset":
+            self.version = message[1]
+            self.apps = EMPTY
+            if self.ui_visible:
+                self.update_list_signal.emit(self.apps)
+        elif kind == "status":
+            self.status = message[1]
+            if self.ui_visible:
+                self.update_status_signal.emit(self.status)
+        elif kind == "debug":
+            with self.debug_lock:
+                self.debug_tail.extend(message[1])
+            if self.ui_visible:
+                self.update_debug_signal.emit(self.debug_text())
+
+    def emit_all(self):
+        if not self.ui_visible:
+            return
+        self.update_status_signal.emit(self.status)
+        self.update_list_signal.emit(self.apps)
+        self.update_debug_signal.emit(self.debug_text())
+
+    def debug_text(self):
+        with self.debug_lock:
+            return "\n".join(self.debug_tail)
+
+    def set_ui_visible(self, visible):
+        # Called on the GUI thread; the catch-up is emitted from here since the mirrored state is complete
+        was_visible, self.ui_visible = self.ui_visible, visible
+        if visible and not was_visible:
+            self.emit_all()
+
+    def send(self, command):
+        if self.conn is None:
+            return
+        try:
+            send_message(self.conn, command)
+        except OSError as e:
+            logging.error(f"Error sending {command[0]} to collector: {e}")
+
+    def current_apps(self):
+        return self.apps
+
+    def reset(self):
+        self.send(["reset"])
+
+    def end_session(self):
+        # The daemon saves and clears the session; sent before detaching, on the same connection
+        self.send(["end_session"])
+        self.stop()
+
+    def stop(self):
+        # Detach only; the collector keeps tracking for other clients
+        self.running = False
+        if self.conn is not None:
+            self.conn.close()
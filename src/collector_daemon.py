@@ -0,0 +1,135 @@
+import os
+import asyncio
+import threading
+from collections import deque
+from multiprocessing.connection import Listener
+from .app_tracker_utils import app_tracker_utils
+from .tracker_core import TrackerCore
+from .config import COLLECTOR_ADDRESS, load_collector_authkey, settings
+from .collector_protocol import ClientWriter, recv_message, encode_changes, prepare_socket_directory
+from .state_snapshot import thaw
+
+# Messages sent to clients (JSON arrays):
+#   ["snapshot", version, apps, status, debug_lines]  on connect
+#   ["delta", version, [[category, app, window, seconds], ...]]
+#   ["status", text] / ["debug", lines] / ["reset", version]
+# Commands accepted from clients: ["reset"], ["end_session"], ["update_settings", changes] and ["stop"]
+
+class CollectorDaemon:
+    def __init__(self, address=COLLECTOR_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey or load_collector_authkey()
+        self.core = TrackerCore(on_status=self.publish_status, on_update=self.publish_delta, on_debug=self.publish_debug)
+        self.clients = []  # ClientWriter per attached client
+        self.clients_lock = threading.Lock()  # Also orders snapshots against deltas
+        self.listener = None
+        self.version = 0
+        self.status = ""
+        self.debug_tail = deque(maxlen=1000)
+
+    def serve_forever(self):
+        if os.name != "nt":
+            prepare_socket_directory(self.address)
+            if os.path.exists(self.address):
+                os.remove(self.address)  # Stale socket left by a previous run
+        self.listener = Listener(self.address, authkey=self.authkey)
+        if os.name != "nt":
+            os.chmod(self.address, 0o600)
+        app_tracker_utils.log_debug(f"Collector daemon listening on {self.address}")
+        threading.Thread(target=self.accept_clients, daemon=True).start()
+        try:
+            asyncio.run(self.core.run())
+        finally:
+            self.listener.close()
+            with self.clients_lock:
+                clients, self.clients = self.clients, []
+            for writer in clients:
+                writer.close()
+
+    def accept_clients(self):
+        while self.core.running:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break  # Listener closed during shutdown
+            except Exception as e:
+                app_tracker_utils.log_debug(f"Rejected collector client: {e}", error=True)
+                continue
+            writer = ClientWriter(conn, self.remove_client)
+            with self.clients_lock:
+                writer.put(["snapshot", self.version, thaw(self.core.snapshot.apps), self.status, list(self.debug_tail)])
+                self.clients.append(writer)
+            writer.start()
+            app_tracker_utils.log_debug(f"Collector client attached ({len(self.clients)} connected)")
+            threading.Thread(target=self.handle_commands, args=(writer,), daemon=True).start()
+
+    def handle_commands(self, writer):
+        while True:
+            try:
+                command = recv_message(writer.conn)
+            except (EOFError, OSError, ValueError):
+                break
+            if not isinstance(command, list) or not command:
+                continue
+            if command[0] == "reset":
+                # Applied on the tracker loop so no delta from before the reset can follow it
+                self.core.call_soon(self.apply_reset)
+            elif command[0] == "end_session":
+                self.core.call_soon(self.apply_end_session)
+            elif command[0] == "update_settings" and len(command) == 2 and isinstance(command[1], dict):
+                settings.update(command[1])
+            elif command[0] == "stop":
+                self.core.stop()
+        self.remove_client(writer)
+
+    def apply_reset(self):
+        with self.clients_lock:
+            self.core.reset_state()
+            self.version += 1
+            version = self.version
+        self.broadcast(["reset", version])
+
+    def apply_end_session(self):
+        # The ended session stays in the history file; the cleared state is not saved over it
+        apps = self.core.snapshot.apps
+        self.apply_reset()
+        self.core.save_session(apps)
+
+    def remove_client(self, writer):
+        with self.clients_lock:
+            if writer not in self.clients:
+                return
+            self.clients.remove(writer)
+        writer.close()
+
+    def broadcast(self, message):
+        # Only queues; each client's writer thread does the sending
+        stalled = []
+        with self.clients_lock:
+            for writer in self.clients:
+                if not writer.put(message):
+                    stalled.append(writer)
+        for writer in stalled:
+            app_tracker_utils.log_debug("Dropping collector client that stopped reading", error=True)
+            self.remove_client(writer)
+
+    def publish_status(self, text):
+        self.status = text
+        self.broadcast(["status", text])
+
+    def publish_delta(self, apps, changes):
+        if not changes:
+            return
+        with self.clients_lock:
+            self.version += 1
+            version = self.version
+        self.broadcast(["delta", version, encode_changes(changes)])
+
+    def publish_debug(self, lines):
+        if not lines:
+            return
+        self.debug_tail.extend(lines)
+        self.broadcast(["debug", lines])
+
+    def stop(self):
+        self.core.stop()
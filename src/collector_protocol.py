@@ -0,0 +1,67 @@
+import os
+import json
+import queue
+import threading
+
+# Wire format between the collector daemon and its clients: one JSON document per message.
+# Connection.send/recv would pickle, which lets any peer that gets past the handshake run code.
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+def send_message(conn, message):
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+def recv_message(conn):
+    # Raises OSError for oversized messages and ValueError for malformed ones
+    return json.loads(conn.recv_bytes(MAX_MESSAGE_SIZE).decode("utf-8"))
+
+def encode_changes(changes):
+    # JSON objects cannot have tuple keys
+    return [[category, app, window, seconds] for (category, app, window), seconds in changes.items()]
+
+def decode_changes(rows):
+    return {(category, app, window): seconds for category, app, window, seconds in rows}
+
+def prepare_socket_directory(address):
+    # Unix sockets live in a directory only the current user can enter
+    directory = os.path.dirname(address)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    stat = os.stat(directory)
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        raise PermissionError(f"{directory} must be owned by the current user and not accessible to others")
+
+class ClientWriter:
+    # Sends one client's messages on its own thread, so a stalled client never blocks the tracker
+    def __init__(self, conn, on_closed, queue_size=1000):
+        self.conn = conn
+        self.on_closed = on_closed  # (writer) -> None, called once the writer stops
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, message):
+        # Returns False if the client has fallen too far behind
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            try:
+                send_message(self.conn, message)
+            except (OSError, EOFError, ValueError):
+                break
+        self.on_closed(self)
+
+    def close(self):
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass  # Closing the connection below makes the pending send fail instead
+        self.conn.close()
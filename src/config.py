@@ -1,11 +1,20 @@
 import json
 import os
+import getpass
+import secrets
+import tempfile
+from .settings_store import SettingsStore
 
 # ✅ File Paths
 FILE_PATHS = {
     "DATA_FILE": "history.json",
     "SETTINGS_FILE": "settings.json",
-    "DEBUG_FILE": "debug.log"
+    "DEBUG_FILE": "debug.log",
+    "MODEL_FILE": "video_activity_model.npz",
+    "TRAINING_DATA_DIR": "training_data",
+    "FLEET_STATE_FILE": "fleet_state.json",
+    "PROFILE_FILE": "profile.collapsed",
+    "BASELINE_FILE": "baselines.json"
 }
 
 # ✅ Default Settings
@@ -15,7 +24,26 @@ DEFAULTS = {
     "mem_threshold": 5,   # Example value, adjust as needed.
     "io_threshold": 1000000,  # Example value for IO.
     "grace_period": 5,  
-    "max_progress_time": 10 * 3600  
+    "max_progress_time": 10 * 3600,
+    "hourly_wage": 10,
+    "collect_training_data": False,  # Opt-in: record labeled feature rows for ml_model.py
+    "training_label": 0,  # Label written with collected rows (1 while a video is playing)
+    "use_collector_daemon": False,  # GUI attaches to a separate `main.py --collector` process
+    "fleet_server": "",  # host:port of a fleet aggregation server; empty disables uploads
+    "fleet_upload_interval": 60,
+    "fleet_token": "",  # Shared secret of the fleet server, if it was started with one
+    "title_rules": None,  # [[regex, replacement], ...] applied to window titles; None uses the built-in rules
+    "max_titles_per_app": 50,  # Titles beyond this per app are folded into "Other windows"; 0 disables the cap
+    "category_rates": {},  # Hourly rate per category, overrides hourly_wage
+    "app_rates": {},  # Hourly rate per app, overrides category_rates
+    "billing_rounding": None,  # e.g. {"increment_minutes": 6, "mode": "up"}, applied per app
+    "resolve_version_info": False,  # Read FileDescription/version from executables when resolving apps
+    "profiling_enabled": False,  # Run the sampling profiler; stacks are written when it stops
+    "query_api_port": 0,  # Serve the read-only query API on 127.0.0.1:<port>; 0 disables it
+    "query_journal_size": 100000,  # Time slices kept for time-range and since-sequence queries
+    "deep_idle_enabled": True,  # Stop polling once the inactivity timeout passes, until input arrives
+    "deep_idle_heartbeat": 300,  # Seconds between passive-activity checks while in deep idle
+    "close_to_tray": False  # Closing the window hides it to the system tray; tracking continues
 }
 
 # ✅ Load or Initialize Settings
@@ -23,7 +51,8 @@ def load_settings():
     if os.path.exists(FILE_PATHS["SETTINGS_FILE"]):
         try:
             with open(FILE_PATHS["SETTINGS_FILE"], "r") as f:
-                return json.load(f)
+                # Keys added since the file was written fall back to their defaults
+                return {**DEFAULTS, **json.load(f)}
         except json.JSONDecodeError:
             # Log the error and return default settings
             print("Error decoding JSON from settings file. Using default settings.")
@@ -31,11 +60,39 @@ def load_settings():
     return DEFAULTS.copy()
 
 def reset_settings():
-    with open(FILE_PATHS["SETTINGS_FILE"], "w") as f:
-        json.dump(DEFAULTS, f)
-    return DEFAULTS.copy()
+    settings.reset(DEFAULTS)
+    return settings
+
+# Shared live settings; subscribers are notified of changes, writes to disk are debounced
+settings = SettingsStore(FILE_PATHS["SETTINGS_FILE"], load_settings())
 
-settings = load_settings()
+# ✅ Collector Daemon IPC (per-user named pipe on Windows, Unix-domain socket in a user-only directory elsewhere)
+if os.name == "nt":
+    COLLECTOR_ADDRESS = rf"\\.\pipe\eagle_eye_collector_{getpass.getuser()}"
+else:
+    COLLECTOR_ADDRESS = os.path.join(tempfile.gettempdir(), f"eagle_eye-{os.getuid()}", "collector.sock")
+COLLECTOR_KEY_FILE = os.path.join(os.path.expanduser("~"), ".eagle_eye_collector.key")
+
+def load_collector_authkey(path=COLLECTOR_KEY_FILE):
+    # Random per-user secret shared by the daemon and its clients, readable only by its owner
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    # mkstemp creates the file with owner-only permissions; linking publishes it atomically
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".eagle_eye_key")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(32))
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass  # Another process created it first; use theirs
+    finally:
+        os.remove(temp_path)
+    with open(path, "rb") as f:
+        return f.read()
 
 # ✅ List of System Processes to Exclude
 SYSTEM_PROCESSES = [
@@ -0,0 +1,103 @@
+import os
+import glob
+import time
+import queue
+import threading
+import numpy as np
+
+from .process_tree import ProcessTree
+
+# Columns of every chunk file, in order
+COLUMNS = ['timestamp', 'pid', 'cpu_usage', 'io_rate', 'user_interactions', 'foreground', 'video_playing']
+COLUMN_TYPES = {
+    'timestamp': np.float64,
+    'pid': np.int32,
+    'cpu_usage': np.float32,
+    'io_rate': np.float32,
+    'user_interactions': np.int32,
+    'foreground': np.int8,
+    'video_playing': np.int8
+}
+
+class TrainingDataCollector:
+    def __init__(self, directory, chunk_rows=50000, queue_size=1000, log=None):
+        self.directory = directory
+        self.chunk_rows = chunk_rows  # Rows per chunk file before rotating to a new one
+        self.queue = queue.Queue(maxsize=queue_size)  # Bounded so a slow disk never stalls the tracker
+        self.log = log or (lambda message, error=False: None)
+        self.columns = {name: [] for name in COLUMNS}
+        self.process_tree = ProcessTree()  # Same per-app rollup as the tracker, so features match at inference
+        self.dropped = 0
+        self.chunks_written = 0
+        self.thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.log(f"Training data collector started, writing to {self.directory}")
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)  # Sentinel; blocks at most until the worker drains one item
+        self.thread.join()
+        self.thread = None
+        self.log(f"Training data collector stopped ({self.chunks_written} chunks written, {self.dropped} samples dropped)")
+
+    def record(self, timestamp, pids, foreground_pid, user_interactions, label):
+        # Called from the tracker loop; the psutil sampling happens on the worker thread
+        try:
+            self.queue.put_nowait((timestamp, tuple(pids), foreground_pid, user_interactions, label))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.sample(*item)
+            if len(self.columns['timestamp']) >= self.chunk_rows:
+                self.flush()
+        self.flush()
+
+    def sample(self, timestamp, pids, foreground_pid, user_interactions, label):
+        # Apps seen for the first time are only primed; their first row comes with the next sample
+        usage = self.process_tree.usage(pids)
+        for pid in pids:
+            if pid not in usage:
+                continue
+            self.columns['timestamp'].append(timestamp)
+            self.columns['pid'].append(pid)
+            self.columns['cpu_usage'].append(usage[pid].cpu_percent)
+            self.columns['io_rate'].append(usage[pid].io_rate)
+            self.columns['user_interactions'].append(user_interactions)
+            self.columns['foreground'].append(1 if pid == foreground_pid else 0)
+            self.columns['video_playing'].append(label)
+
+    def flush(self):
+        if not self.columns['timestamp']:
+            return
+        arrays = {name: np.asarray(values, dtype=COLUMN_TYPES[name]) for name, values in self.columns.items()}
+        self.columns = {name: [] for name in COLUMNS}
+        name = f"chunk_{int(time.time() * 1000)}_{os.getpid()}_{self.chunks_written:05d}.npz"
+        path = os.path.join(self.directory, name)
+        # Write under a temporary name so readers never see a partial chunk
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(temp_path, path)
+            self.chunks_written += 1
+        except OSError as e:
+            self.log(f"Error writing training data chunk {path}: {e}", error=True)
+
+def list_chunks(directory):
+    return sorted(glob.glob(os.path.join(directory, "chunk_*.npz")))
+
+def iter_chunks(directory, columns=COLUMNS):
+    # Yields one chunk at a time so memory stays bounded by the chunk size
+    for path in list_chunks(directory):
+        with np.load(path) as arrays:
+            yield {name: arrays[name] for name in columns}
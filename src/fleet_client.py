@@ -0,0 +1,148 @@
+import os
+import json
+import socket
+import time
+import threading
+from .fleet_server import HEADER, MAX_FRAME_SIZE, encode_frame, decode_payload
+
+def recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Fleet server closed the connection")
+        data += chunk
+    return data
+
+def request(address, message, timeout=10.0, token=None):
+    host, port = address
+    if token:
+        message = dict(message, token=token)
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(encode_frame(message))
+        (length,) = HEADER.unpack(recv_exactly(sock, HEADER.size))
+        if length > MAX_FRAME_SIZE:
+            raise ConnectionError(f"Response of {length} bytes exceeds limit")
+        return decode_payload(recv_exactly(sock, length))
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return host, int(port)
+
+class FleetUploader:
+    # Batches per-window time increments and pushes them to a fleet server.
+    # A batch keeps its sequence number until acknowledged, so retries are idempotent.
+    # The state file holds the unacknowledged batch and the time not yet in a batch.
+    def __init__(self, address, host_name, state_file, upload_interval=60.0, log=None, token=None):
+        self.address = address
+        self.token = token
+        self.host_name = host_name
+        self.state_file = state_file
+        self.upload_interval = upload_interval
+        self.log = log or (lambda message, error=False: None)
+        self.lock = threading.Lock()
+        self.pending = {}  # (day, category, app, window) -> seconds not yet in a batch
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.state_lost = False  # Set when the state file was missing or unreadable at startup
+        self.synced = False  # Sequence checked against the server's last_seq since startup
+        self.seq, self.unacked, self.pending = self.load_state()
+
+    def load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r") as f:
+                    state = json.load(f)
+                pending = {tuple(record[:4]): record[4] for record in state.get("pending", [])}
+                return state["seq"], state.get("unacked"), pending
+            except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+                self.log(f"Ignoring corrupt fleet state file: {e}", error=True)
+        self.state_lost = True
+        return 0, None, {}
+
+    def save_state(self):
+        with self.lock:
+            pending = [[*key, seconds] for key, seconds in self.pending.items()]
+        temp_path = self.state_file + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"seq": self.seq, "unacked": self.unacked, "pending": pending}, f)
+        os.replace(temp_path, self.state_file)
+
+    def add(self, category, app, window_title, seconds):
+        key = (time.strftime("%Y-%m-%d"), category, app, window_title)
+        with self.lock:
+            self.pending[key] = self.pending.get(key, 0) + seconds
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        # Final attempts until nothing is left; what could not be sent is resent from the state file
+        while (self.unacked is not None or self.pending) and self.upload():
+            pass
+        self.save_state()
+
+    def run(self):
+        while not self.stop_event.wait(self.upload_interval):
+            if not self.upload():
+                self.save_state()  # Time added while the server is unreachable survives a crash
+
+    def next_batch(self):
+        # Reuse the unacknowledged batch if there is one, otherwise freeze the pending records
+        if self.unacked is None:
+            with self.lock:
+                if not self.pending:
+                    return None
+                records = [[*key, seconds] for key, seconds in self.pending.items()]
+                self.pending = {}
+            self.seq += 1
+            self.unacked = {"host": self.host_name, "seq": self.seq, "records": records}
+            self.save_state()
+        return self.unacked
+
+    def sync_sequence(self):
+        # Without this a lost state file restarts at seq 1 and the server discards every
+        # batch as a duplicate until the old sequence is reached
+        try:
+            response = request(self.address, {"query": "last_seq", "host": self.host_name}, token=self.token)
+            server_seq = int(response["results"])
+        except (OSError, ConnectionError, ValueError, KeyError, TypeError) as e:
+            self.log(f"Fleet sequence sync failed, will retry: {e}", error=True)
+            return False
+        if server_seq > self.seq:
+            self.log(f"Fleet sequence {self.seq} is behind the server's {server_seq}, continuing after it", error=True)
+            self.seq = server_seq
+            if self.unacked is not None and self.state_lost:
+                # Formed by this run after the state was lost and never sent, so it cannot have been applied
+                self.seq += 1
+                self.unacked["seq"] = self.seq
+            self.save_state()
+        self.synced = True
+        return True
+
+    def upload(self):
+        batch = self.next_batch()
+        if batch is None:
+            return True
+        if not self.synced:
+            if not self.sync_sequence():
+                return False
+            batch = self.unacked
+        try:
+            response = request(self.address, batch, token=self.token)
+        except (OSError, ConnectionError, ValueError) as e:
+            self.log(f"Fleet upload of batch {batch['seq']} failed, will retry: {e}", error=True)
+            return False
+        if response.get("ack") != batch["seq"]:
+            self.log(f"Unexpected fleet server response: {response}", error=True)
+            return False
+        self.unacked = None
+        self.save_state()
+        self.log(f"Uploaded fleet batch {batch['seq']} ({len(batch['records'])} records, duplicate={response['duplicate']})")
+        return True
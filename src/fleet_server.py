@@ -0,0 +1,210 @@
+import os
+import hmac
+import asyncio
+import argparse
+import ipaddress
+import json
+import sqlite3
+import struct
+import zlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Wire format: 4-byte big-endian length followed by zlib-compressed JSON.
+# Every message carries "token" when the server was started with one.
+# Upload:  {"host": str, "seq": int, "records": [[day, category, app, window, seconds], ...]}
+#          -> {"ack": seq, "duplicate": bool}
+# Query:   {"query": "top_apps", "start": day, "end": day, "limit": n}
+#          -> {"results": [[app, seconds], ...]}
+HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+MAX_PAYLOAD_SIZE = 64 * 1024 * 1024  # Decompressed; a small frame can inflate enormously
+
+def encode_frame(message):
+    payload = zlib.compress(json.dumps(message).encode("utf-8"))
+    return HEADER.pack(len(payload)) + payload
+
+def decode_payload(payload, max_size=MAX_PAYLOAD_SIZE):
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(payload, max_size)
+    # Input left over means the limit was hit (or trailing garbage); a missing end means truncation
+    if decompressor.unconsumed_tail or decompressor.unused_data or not decompressor.eof:
+        raise ValueError(f"Payload exceeds {max_size} bytes decompressed or is malformed")
+    return json.loads(data.decode("utf-8"))
+
+async def read_frame(reader):
+    header = await reader.readexactly(HEADER.size)
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds limit")
+    return decode_payload(await reader.readexactly(length))
+
+class FleetStore:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, last_seq INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS usage (
+                day TEXT NOT NULL, host TEXT NOT NULL, category TEXT NOT NULL, app TEXT NOT NULL,
+                window TEXT NOT NULL, seconds REAL NOT NULL,
+                PRIMARY KEY (day, host, category, app, window)
+            );
+            CREATE INDEX IF NOT EXISTS usage_host_day ON usage (host, day);
+            -- Per-day rollup so fleet-wide queries never scan per-host rows
+            CREATE TABLE IF NOT EXISTS app_daily (
+                day TEXT NOT NULL, app TEXT NOT NULL, seconds REAL NOT NULL,
+                PRIMARY KEY (day, app)
+            );
+            -- Imported history files, so an import applies each file once; separate from the
+            -- upload sequence so imports never collide with a host's live uploads
+            CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY, version TEXT NOT NULL, host TEXT NOT NULL);
+        """)
+
+    def apply_batch(self, host, seq, records):
+        # Returns False if the batch was already applied (retried upload)
+        with self.conn:
+            row = self.conn.execute("SELECT last_seq FROM hosts WHERE host = ?", (host,)).fetchone()
+            if row is not None and seq <= row[0]:
+                return False
+            self.add_records(host, records)
+            self.conn.execute("INSERT OR REPLACE INTO hosts (host, last_seq) VALUES (?, ?)", (host, seq))
+        return True
+
+    def apply_import(self, source, version, host, records):
+        # Returns False if the source file was imported before; a file changed since then is
+        # not imported again, as its earlier totals are already counted
+        with self.conn:
+            row = self.conn.execute("SELECT version FROM imports WHERE source = ?", (source,)).fetchone()
+            if row is not None:
+                if row[0] != version:
+                    logging.warning(f"{source} changed since it was imported; not importing it again")
+                return False
+            self.add_records(host, records)
+            self.conn.execute("INSERT INTO imports (source, version, host) VALUES (?, ?, ?)", (source, version, host))
+        return True
+
+    def add_records(self, host, records):
+        # Called inside a transaction
+        self.conn.executemany("""
+            INSERT INTO usage (day, host, category, app, window, seconds) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, host, category, app, window) DO UPDATE SET seconds = seconds + excluded.seconds
+        """, [(day, host, category, app, window, seconds) for day, category, app, window, seconds in records])
+        self.conn.executemany("""
+            INSERT INTO app_daily (day, app, seconds) VALUES (?, ?, ?)
+            ON CONFLICT (day, app) DO UPDATE SET seconds = seconds + excluded.seconds
+        """, [(day, app, seconds) for day, category, app, window, seconds in records])
+
+    def last_seq(self, host):
+        row = self.conn.execute("SELECT last_seq FROM hosts WHERE host = ?", (host,)).fetchone()
+        return row[0] if row else 0
+
+    def top_apps(self, start, end, limit=10):
+        return self.conn.execute("""
+            SELECT app, SUM(seconds) FROM app_daily WHERE day BETWEEN ? AND ?
+            GROUP BY app ORDER BY SUM(seconds) DESC LIMIT ?
+        """, (start, end, limit)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+class FleetServer:
+    def __init__(self, store, queue_size=64, token=None):
+        self.store = store
+        self.token = token  # Shared secret required in every message; None accepts any local client
+        self.queue_size = queue_size  # Batches accepted but not yet written; full queue stalls readers
+        self.queue = None
+        self.executor = ThreadPoolExecutor(max_workers=1)  # All SQLite access happens on one thread
+        self.server = None
+        self.writer_task = None
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.writer_task = asyncio.ensure_future(self.write_batches())
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def write_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message, future = await self.queue.get()
+            try:
+                applied = await loop.run_in_executor(
+                    self.executor, self.store.apply_batch, message["host"], message["seq"], message["records"])
+                future.set_result(applied)
+            except Exception as e:
+                future.set_exception(e)
+
+    async def handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    message = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if self.token is not None and not hmac.compare_digest(str(message.get("token", "")), self.token):
+                    writer.write(encode_frame({"error": "unauthorized"}))
+                    await writer.drain()
+                    logging.error("Dropping fleet client with a missing or wrong token")
+                    break
+                if "query" in message:
+                    response = await self.handle_query(message)
+                else:
+                    future = loop.create_future()
+                    # Waiting here stops reading from the socket, which pushes back on the sender
+                    await self.queue.put((message, future))
+                    applied = await future
+                    response = {"ack": message["seq"], "duplicate": not applied}
+                writer.write(encode_frame(response))
+                await writer.drain()
+        except (ValueError, KeyError, zlib.error) as e:
+            logging.error(f"Dropping fleet client after bad frame: {e}")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_query(self, message):
+        loop = asyncio.get_running_loop()
+        if message["query"] == "top_apps":
+            rows = await loop.run_in_executor(
+                self.executor, self.store.top_apps, message["start"], message["end"], message.get("limit", 10))
+            return {"results": [list(row) for row in rows]}
+        if message["query"] == "last_seq":
+            return {"results": await loop.run_in_executor(self.executor, self.store.last_seq, message["host"])}
+        return {"error": f"Unknown query {message['query']}"}
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.writer_task:
+            self.writer_task.cancel()
+        self.executor.shutdown(wait=True)
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+async def serve(host, port, db_path, token=None):
+    if not token and not is_loopback(host):
+        raise SystemExit(f"Refusing to listen on {host} without a token (--token or EAGLE_EYE_FLEET_TOKEN)")
+    server = FleetServer(FleetStore(db_path), token=token or None)
+    port = await server.start(host, port)
+    logging.info(f"Fleet server listening on {host}:{port}")
+    await server.server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eagle Eye fleet aggregation server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on; other than loopback requires a token")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="fleet.db")
+    parser.add_argument("--token", default=os.environ.get("EAGLE_EYE_FLEET_TOKEN"), help="shared secret clients must send")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    asyncio.run(serve(args.host, args.port, args.db, args.token))
@@ -1,12 +1,16 @@
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QPushButton, QSpinBox, QTreeWidget, QTreeWidgetItem, QListWidget,
-    QTabWidget, QMessageBox, QFormLayout, QDialog, QDialogButtonBox, QProgressBar, QApplication
+    QTabWidget, QMessageBox, QFormLayout, QDialog, QDialogButtonBox, QProgressBar, QApplication,
+    QCheckBox, QSystemTrayIcon, QMenu, QStyle
 )
-from PyQt5.QtCore import pyqtSignal, Qt, QTimer
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer, QEvent
 import logging
 import json  # Add this import for handling JSON operations
-from .app_tracker_utils import app_tracker_utils, save_session_data, load_session_data
+from collections.abc import Mapping
+from .app_tracker_utils import app_tracker_utils, load_session_data
 from .tracker_thread import TrackerThread
+from .collector_client import CollectorClient
+from .billing import BillingEngine
 from .config import settings, FILE_PATHS, reset_settings
 
 # Initialize logging
@@ -16,12 +20,20 @@ class AppTracker(QWidget):
     def __init__(self):
         super().__init__()
         self.initUI()
-        self.tracker_thread = TrackerThread()
+        # Either track in-process or attach as a thin client to a running collector daemon
+        self.use_collector = settings.get("use_collector_daemon", False)
+        self.tracker_thread = CollectorClient() if self.use_collector else TrackerThread()
         self.tracker_thread.update_status_signal.connect(self.update_status)
         self.tracker_thread.update_list_signal.connect(self.update_live_list)
         self.tracker_thread.update_debug_signal.connect(self.update_debug_log)
         self.tracker_thread.start()
-        self.refresh_debug_log()
+        # In-process only: the tracker's own log is polled, and only while the window is visible
+        self.debug_timer = QTimer(self)
+        self.debug_timer.setInterval(1000)
+        self.debug_timer.timeout.connect(self.refresh_debug_log)
+        self.ui_visible = None
+        self.quitting = False
+        self.init_tray()
         logging.info("AppTracker initialized and tracker thread started.")
 
     def initUI(self):
@@ -69,6 +81,11 @@ class AppTracker(QWidget):
             self.copy_log_button.clicked.connect(self.copy_log_to_clipboard)
             debug_layout.addWidget(self.copy_log_button)
 
+            self.profile_button = QPushButton("Stop Profiling" if settings.get("profiling_enabled", False) else "Start Profiling")
+            self.profile_button.setToolTip("Sample the tracker and GUI threads; stacks are written when stopped")
+            self.profile_button.clicked.connect(self.toggle_profiling)
+            debug_layout.addWidget(self.profile_button)
+
             settings_layout = QFormLayout(self.settings_tab)
 
             self.inactivity_box = QSpinBox()
@@ -89,6 +106,11 @@ class AppTracker(QWidget):
             self.hourly_wage_box.setToolTip("Set your hourly wage in dollars")
             self.hourly_wage_box.valueChanged.connect(self.update_settings)
 
+            self.tray_box = QCheckBox()
+            self.tray_box.setChecked(settings.get("close_to_tray", False))
+            self.tray_box.setToolTip("Keep tracking in the system tray when the window is closed")
+            self.tray_box.stateChanged.connect(self.update_settings)
+
             self.reset_settings_button = QPushButton("Reset Settings")
             self.reset_settings_button.setToolTip("Click to reset settings to default values")
             self.reset_settings_button.clicked.connect(self.reset_settings)
@@ -97,6 +119,7 @@ class AppTracker(QWidget):
             settings_layout.addRow(QLabel("Inactivity Timeout (sec):"), self.inactivity_box)
             settings_layout.addRow(QLabel("CPU Threshold (%):"), self.cpu_box)
             settings_layout.addRow(QLabel("Hourly Wage ($):"), self.hourly_wage_box)
+            settings_layout.addRow(QLabel("Close to Tray:"), self.tray_box)
 
             self.settings_tab.setLayout(settings_layout)
             main_layout = QVBoxLayout()
@@ -152,15 +175,31 @@ class AppTracker(QWidget):
             logging.error(f"Error copying log to clipboard: {e}")
             QMessageBox.critical(self, "Error", f"An error occurred while copying the log to clipboard: {e}")
 
+    def toggle_profiling(self):
+        try:
+            # Goes through the settings store so a collector daemon follows the same switch
+            enabled = not settings.get("profiling_enabled", False)
+            settings.update({"profiling_enabled": enabled})
+            if self.use_collector:
+                self.tracker_thread.send(["update_settings", {"profiling_enabled": enabled}])
+            self.profile_button.setText("Stop Profiling" if enabled else "Start Profiling")
+            logging.info(f"Profiling {'started' if enabled else 'stopped'}.")
+        except Exception as e:
+            logging.error(f"Error toggling profiling: {e}")
+            QMessageBox.critical(self, "Error", f"An error occurred while toggling profiling: {e}")
+
     def update_settings(self):
         try:
-            settings["inactivity_timeout"] = self.inactivity_box.value()
-            settings["cpu_threshold"] = self.cpu_box.value()
-            settings["hourly_wage"] = self.hourly_wage_box.value()
-            with open(FILE_PATHS["SETTINGS_FILE"], "w") as f:
-                json.dump(settings, f)
-            logging.info("Settings updated.")
-            QMessageBox.information(self, "Settings Updated", "Settings have been updated successfully.")
+            # Applied to the running tracker immediately; the store coalesces the file write
+            changes = settings.update({
+                "inactivity_timeout": self.inactivity_box.value(),
+                "cpu_threshold": self.cpu_box.value(),
+                "hourly_wage": self.hourly_wage_box.value(),
+                "close_to_tray": self.tray_box.isChecked()
+            })
+            if changes and self.use_collector:
+                self.tracker_thread.send(["update_settings", changes])
+            logging.info(f"Settings updated: {changes}")
         except Exception as e:
             logging.error(f"Error updating settings: {e}")
             QMessageBox.critical(self, "Error", f"An error occurred while updating the settings: {e}")
@@ -169,11 +208,14 @@ class AppTracker(QWidget):
         try:
             global settings
             settings = reset_settings()
+            if self.use_collector:
+                self.tracker_thread.send(["update_settings", settings.copy()])
             self.inactivity_box.setValue(settings["inactivity_timeout"])
             self.cpu_box.setValue(settings["cpu_threshold"])
             self.hourly_wage_box.setValue(settings["hourly_wage"])
             self.cpu_box.setValue(settings["cpu_threshold"])
             self.hourly_wage_box.setValue(settings["hourly_wage"])
+            self.tray_box.setChecked(settings["close_to_tray"])
             QMessageBox.information(self, "Settings Reset", "Settings have been reset to default values.")
             logging.info("Settings reset to default values.")
         except Exception as e:
@@ -196,7 +238,7 @@ class AppTracker(QWidget):
                 logging.debug(f"Processing category: {category}")
                 for app, window_times in app_times.items():
                     logging.debug(f"Processing app: {app} with window_times: {window_times}")
-                    if not isinstance(window_times, dict):
+                    if not isinstance(window_times, Mapping):
                         app_tracker_utils.log_debug(f"Error: window_times is not a dict for app {app} in category {category}: {window_times}", error=True)
                         continue
                     app_item = self.find_or_create_app_item(app)
@@ -255,7 +297,6 @@ class AppTracker(QWidget):
     def refresh_debug_log(self):
         try:
             self.update_debug_log("\n".join(app_tracker_utils.debug_logs))
-            QTimer.singleShot(1000, self.refresh_debug_log)  # Refresh every second
         except Exception as e:
             logging.error(f"Error refreshing debug log: {e}")
             QMessageBox.critical(self, "Error", f"An error occurred while refreshing the debug log: {e}")
@@ -271,17 +312,91 @@ class AppTracker(QWidget):
 
     def reset_progress(self):
         try:
-            app_tracker_utils.active_apps = {}
-            self.update_live_list(app_tracker_utils.active_apps)
+            self.tracker_thread.reset()
+            self.update_live_list({})
             logging.info("Progress reset.")
         except Exception as e:
             logging.error(f"Error resetting progress: {e}")
             QMessageBox.critical(self, "Error", f"An error occurred while resetting the progress: {e}")
 
+    def init_tray(self):
+        self.tray_icon = None
+        if not QSystemTrayIcon.isSystemTrayAvailable():
+            return
+        try:
+            self.tray_icon = QSystemTrayIcon(self.style().standardIcon(QStyle.SP_ComputerIcon), self)
+            self.tray_icon.setToolTip("Active App Tracker")
+            menu = QMenu(self)
+            menu.addAction("Show / Hide", self.toggle_window)
+            menu.addAction("Quit", self.quit_application)
+            self.tray_icon.setContextMenu(menu)
+            self.tray_icon.activated.connect(self.tray_activated)
+            self.tray_icon.show()
+            # The window may be hidden while dialogs come and go; quitting is explicit
+            QApplication.instance().setQuitOnLastWindowClosed(False)
+        except Exception as e:
+            logging.error(f"Error creating tray icon: {e}")
+            self.tray_icon = None
+
+    def tray_activated(self, reason):
+        if reason == QSystemTrayIcon.Trigger:
+            self.toggle_window()
+
+    def toggle_window(self):
+        if self.isVisible() and not self.isMinimized():
+            self.hide()
+        else:
+            self.showNormal()
+            self.activateWindow()
+
+    def quit_application(self):
+        self.quitting = True
+        self.close()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_ui_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_ui_visibility()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_ui_visibility()  # Minimize and restore
+
+    def update_ui_visibility(self):
+        # Hidden or minimized: the tracker stops building UI payloads, then sends one catch-up when shown
+        try:
+            visible = self.isVisible() and not self.isMinimized()
+            if visible == self.ui_visible:
+                return
+            self.ui_visible = visible
+            self.tracker_thread.set_ui_visible(visible)
+            if not self.use_collector:
+                if visible:
+                    self.refresh_debug_log()
+                    self.debug_timer.start()
+                else:
+                    self.debug_timer.stop()
+            logging.info(f"Window {'shown' if visible else 'hidden'}, UI updates {'resumed' if visible else 'suspended'}.")
+        except Exception as e:
+            logging.error(f"Error updating UI visibility: {e}")
+
     def closeEvent(self, event):
         try:
+            if settings.get("close_to_tray", False) and self.tray_icon is not None and not self.quitting:
+                event.ignore()
+                self.hide()
+                logging.info("Window closed to the tray.")
+                return
             self.tracker_thread.stop()
+            settings.flush()  # Write any settings change still waiting on the debounce timer
             event.accept()
+            if self.tray_icon is not None:
+                self.tray_icon.hide()
+                QApplication.instance().quit()
             logging.info("Application closed.")
         except Exception as e:
             logging.error(f"Error closing application: {e}")
@@ -289,11 +404,14 @@ class AppTracker(QWidget):
 
     def end_session(self):
         try:
-            self.tracker_thread.stop()
-            dialog = EndSessionDialog(app_tracker_utils.active_apps, settings.get("hourly_wage", 10), self)
+            apps = self.tracker_thread.current_apps()  # Fixed snapshot; later tracking does not change it
+            dialog = EndSessionDialog(apps, settings.get("hourly_wage", 10), self)
             if dialog.exec_() == QDialog.Accepted:
-                save_session_data(app_tracker_utils.active_apps)  # Pass the required 'data' argument
-                self.reset_progress()
+                # The tracker saves the session before anything is cleared; only the view is reset here
+                self.tracker_thread.end_session()
+                self.update_live_list({})
+            else:
+                self.tracker_thread.stop()
             logging.info("Session ended.")
         except Exception as e:
             logging.error(f"Error ending session: {e}")
@@ -306,6 +424,9 @@ class EndSessionDialog(QDialog):
         self.setGeometry(100, 100, 400, 300)
         self.apps = apps
         self.hourly_wage = hourly_wage
+        # All wage arithmetic happens in the engine on raw seconds; the dialog only mirrors check states
+        self.billing = BillingEngine(apps, hourly_wage, settings.get("category_rates"), settings.get("app_rates"),
+                                     settings.get("billing_rounding"))
 
         layout = QVBoxLayout(self)
 
@@ -325,7 +446,7 @@ class EndSessionDialog(QDialog):
         self.hourly_wage_edit = QSpinBox()
         self.hourly_wage_edit.setRange(1, 1000)
         self.hourly_wage_edit.setValue(self.hourly_wage)
-        self.hourly_wage_edit.valueChanged.connect(self.calculate_total_wage)
+        self.hourly_wage_edit.valueChanged.connect(self.update_hourly_wage)
         layout.addWidget(self.hourly_wage_edit)
 
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -341,12 +462,16 @@ class EndSessionDialog(QDialog):
         try:
             for category, app_times in self.apps.items():
                 for app, window_times in app_times.items():
+                    if not isinstance(window_times, Mapping):
+                        continue
                     app_item = QTreeWidgetItem([app])
+                    app_item.setData(0, Qt.UserRole, (category, app))
                     app_item.setCheckState(3, Qt.Unchecked)
                     self.tree_widget.addTopLevelItem(app_item)
                     for window, time_spent in window_times.items():
                         formatted_time = self.format_time(time_spent)
                         window_item = QTreeWidgetItem([app, window, formatted_time])
+                        window_item.setData(0, Qt.UserRole, (category, app, window))
                         window_item.setCheckState(3, Qt.Unchecked)
                         app_item.addChild(window_item)
             self.tree_widget.expandAll()
@@ -369,35 +494,30 @@ class EndSessionDialog(QDialog):
         try:
             if column == 3:
                 state = item.checkState(column)
-                for i in range(item.childCount()):
-                    child = item.child(i)
-                    child.setCheckState(column, state)
+                key = item.data(0, Qt.UserRole)
+                if len(key) == 2:
+                    self.billing.select_app(*key, state == Qt.Checked)
+                    # Mirror the app's state on its windows without re-entering this handler per child
+                    self.tree_widget.blockSignals(True)
+                    for i in range(item.childCount()):
+                        child = item.child(i)
+                        child.setCheckState(column, state)
+                    self.tree_widget.blockSignals(False)
+                else:
+                    self.billing.select_window(*key, state == Qt.Checked)
                 self.calculate_total_wage()
             logging.debug("Item state changed in EndSessionDialog.")
         except Exception as e:
             logging.error(f"Error handling item change in EndSessionDialog: {e}")
             QMessageBox.critical(self, "Error", f"An error occurred while handling item change: {e}")
 
+    def update_hourly_wage(self, hourly_wage):
+        self.billing.set_hourly_wage(hourly_wage)
+        self.calculate_total_wage()
+
     def calculate_total_wage(self):
         try:
-            total_seconds = 0
-            for i in range(self.tree_widget.topLevelItemCount()):
-                app_item = self.tree_widget.topLevelItem(i)
-                if app_item.checkState(3) == Qt.Checked:
-                    for j in range(app_item.childCount()):
-                        window_item = app_item.child(j)
-                        time_text = window_item.text(2)
-                        hours, minutes, seconds = map(int, time_text.replace("h", "").replace("m", "").replace("s", "").split())
-                        total_seconds += hours * 3600 + minutes * 60 + seconds
-                else:
-                    for j in range(app_item.childCount()):
-                        window_item = app_item.child(j)
-                        if window_item.checkState(3) == Qt.Checked:
-                            time_text = window_item.text(2)
-                            hours, minutes, seconds = map(int, time_text.replace("h", "").replace("m", "").replace("s", "").split())
-                            total_seconds += hours * 3600 + minutes * 60 + seconds
-            hourly_wage = self.hourly_wage_edit.value()
-            total_wage = (total_seconds / 3600) * hourly_wage
+            total_wage = self.billing.total_amount()
             self.total_label.setText(f"Total Wage: ${total_wage:.2f}")
             logging.debug("Total wage calculated in EndSessionDialog.")
         except Exception as e:
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from .fleet_server import FleetStore
+
+# Merges many history.json files ({category: {app: {window: seconds}}}) from different days
+# and hosts. Files are parsed in a process pool, each worker folding its share of files into
+# one partial total (the map-side combine), and the partials are summed at the end. Files are
+# read as a stream so memory follows the number of distinct windows, not the file size.
+
+DAY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+class HistoryStream:
+    # Incremental tokenizer for the two outer object levels; each app's window dict is
+    # decoded on its own with raw_decode, so only one app's data is ever held as text
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # Reads grow with the buffer so a huge value is retried a logarithmic number of times
+        if self.pos > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        data = self.f.read(max(self.chunk_size, len(self.buffer)))
+        if not data:
+            self.eof = True
+        self.buffer += data
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the buffer")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number or literal running to the end of the buffer may continue in the next read
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def members(self):
+        # Yields (key, None) and leaves the stream positioned at each member's value
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1} of the buffer")
+
+def iter_history(path, chunk_size=1 << 20):
+    # Yields (category, app, {window: seconds}) without loading the whole file
+    with open(path, "r", encoding="utf-8") as f:
+        stream = HistoryStream(f, chunk_size)
+        for category in stream.members():
+            for app in stream.members():
+                yield category, app, stream.value()
+
+def merge_into(totals, category, app, window_times):
+    # Non-dict entries (unexpected data from older versions) are skipped like in the query API
+    if not isinstance(window_times, dict):
+        return
+    app_totals = totals.setdefault(category, {}).setdefault(app, {})
+    for window, seconds in window_times.items():
+        app_totals[window] = app_totals.get(window, 0) + seconds
+
+def merge_totals(target, source):
+    for category, app_times in source.items():
+        for app, window_times in app_times.items():
+            merge_into(target, category, app, window_times)
+    return target
+
+def file_key(path, host=None):
+    # (host, day): the host defaults to the parent directory name and the day comes from a
+    # YYYY-MM-DD in the file name, falling back to the file's modification date
+    if host is None:
+        host = os.path.basename(os.path.dirname(os.path.abspath(path))) or "local"
+    match = DAY_PATTERN.search(os.path.basename(path))
+    day = match.group(0) if match else time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(path)))
+    return host, day
+
+def file_source(path):
+    # (path, version) identifying an import; the version changes whenever the file is rewritten
+    stat = os.stat(path)
+    return os.path.abspath(path), f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def parse_files(paths, host=None, chunk_size=1 << 20, by_file=False):
+    # Worker: returns ({(host, day): totals}, [(path, error)]); with by_file the keys are
+    # (host, day, path, version) and every file keeps totals of its own
+    partials, errors = {}, []
+    for path in paths:
+        # A file is folded in only once it parsed completely, so a corrupt one adds nothing
+        totals = {}
+        try:
+            key = file_key(path, host) + (file_source(path) if by_file else ())
+            for category, app, window_times in iter_history(path, chunk_size):
+                merge_into(totals, category, app, window_times)
+        except (OSError, ValueError) as e:
+            errors.append((path, str(e)))
+            continue
+        merge_totals(partials.setdefault(key, {}), totals)
+    return partials, errors
+
+def merge_files(paths, workers=None, host=None, chunk_size=1 << 20, by_file=False):
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    # Interleaved shares keep workers balanced when files are listed by date or size
+    shares = [paths[i::workers] for i in range(workers)]
+    merged, errors = {}, []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partials, share_errors in executor.map(parse_files, shares, [host] * workers, [chunk_size] * workers, [by_file] * workers):
+            for key, totals in partials.items():
+                merge_totals(merged.setdefault(key, {}), totals)
+            errors.extend(share_errors)
+    for path, error in errors:
+        logging.warning(f"Skipped {path}: {error}")
+    return merged, errors
+
+def flatten(partials):
+    # {(host, day): totals} -> one history across all hosts and days
+    merged = {}
+    for totals in partials.values():
+        merge_totals(merged, totals)
+    return merged
+
+def write_history(history, path):
+    temp_file = f"{path}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(history, f)
+    os.replace(temp_file, path)
+
+def import_to_store(partials, store):
+    # partials from merge_files(by_file=True). Each file is applied once, keyed by its path,
+    # so running an import again adds nothing; returns the number of rows imported
+    rows = 0
+    for (host, day, source, version), totals in partials.items():
+        records = [(day, category, app, window, seconds)
+                   for category, app_times in totals.items()
+                   for app, window_times in app_times.items()
+                   for window, seconds in window_times.items()]
+        if store.apply_import(source, version, host, records):
+            rows += len(records)
+        else:
+            logging.info(f"Skipped {source}: already imported")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge history files from many days and hosts")
+    parser.add_argument("files", nargs="+", help="history.json files to merge")
+    parser.add_argument("--output", help="write the merged history to this file")
+    parser.add_argument("--db", help="import into this fleet store (SQLite) instead")
+    parser.add_argument("--host", help="host name for all files (default: parent directory name)")
+    parser.add_argument("--workers", type=int, help="number of parser processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    if not args.output and not args.db:
+        parser.error("one of --output or --db is required")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    started = time.perf_counter()
+    partials, errors = merge_files(args.files, args.workers, args.host, by_file=bool(args.db))
+    if args.output:
+        write_history(flatten(partials), args.output)
+    if args.db:
+        store = FleetStore(args.db)
+        try:
+            rows = import_to_store(partials, store)
+        finally:
+            store.close()
+        logging.info(f"Imported {rows} rows into {args.db}")
+    logging.info(f"Merged {len(args.files)} files in {time.perf_counter() - started:.1f}s ({len(errors)} errors)")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
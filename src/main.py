@@ -1,5 +1,7 @@
 import sys
 import time
+import atexit
+import argparse
 import json
 import os
 import psutil
@@ -17,6 +19,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.app_tracker_utils import app_tracker_utils, save_session_data, load_session_data
 from src.gui import AppTracker
+from src.collector_daemon import CollectorDaemon
 from src.config import settings
 
 # 🚨 Ignore Deprecation Warnings
@@ -25,19 +28,42 @@ warnings.simplefilter("ignore", DeprecationWarning)
 
 # ✅ Track Keyboard & Mouse Activity
 def on_activity(event):
-    global last_active_time, user_active
-    last_active_time = time.time()
-    user_active = True
+    app_tracker_utils.record_interaction()
     app_tracker_utils.log_debug(f"User interaction detected: {event}")
 
 keyboard_listener = keyboard.Listener(on_press=on_activity)
 mouse_listener = mouse.Listener(on_click=on_activity)  # Remove on_scroll
 
+def run_collector():
+    # Headless collection process; GUIs attach to it with use_collector_daemon enabled
+    app_tracker_utils.log_debug("Collector daemon started.")
+    app_tracker_utils.set_tracker_pid(os.getpid())
+    keyboard_listener.start()
+    mouse_listener.start()
+    daemon = CollectorDaemon()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
 def main():
+    parser = argparse.ArgumentParser(description="Eagle Eye application tracker")
+    parser.add_argument("--collector", action="store_true", help="run the headless collector daemon instead of the GUI")
+    parser.add_argument("--profile", action="store_true", help="sample the tracker and GUI threads until exit")
+    args = parser.parse_args()
+    # The profiler runs until it is switched off or the process exits, not until a session ends
+    atexit.register(app_tracker_utils.stop_profiling)
+    if args.profile:
+        app_tracker_utils.start_profiling()
+    if args.collector:
+        run_collector()
+        return
     app_tracker_utils.log_debug("Application started.")
     app_tracker_utils.set_tracker_pid(os.getpid())  # Set the tracker's PID
-    keyboard_listener.start()
-    mouse_listener.start()
+    if not settings.get("use_collector_daemon", False):
+        # Input is tracked by whichever process runs the tracker core
+        keyboard_listener.start()
+        mouse_listener.start()
     app = QApplication(sys.argv)
     global tracker
     tracker = AppTracker()
@@ -1,27 +1,91 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-import joblib
+import numpy as np
 
-# Load the collected data
-data = pd.read_csv('resource_usage_data.csv')
+# Feature order shared by training, export and the runtime inference engine
+FEATURES = ['cpu_usage', 'io_rate', 'user_interactions', 'foreground']
 
-# Split the data into features and labels
-X = data[['cpu_usage', 'io_usage', 'user_interactions']]
-y = data['video_playing']  # Label indicating whether a video is playing
+def export_forest(model, path):
+    # Flatten every tree of the forest into one set of node arrays so the tracker
+    # can score samples with NumPy alone (no sklearn/pandas import at runtime)
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_count = tree.node_count
+        is_leaf = tree.children_left == -1
+        # Leaves point to themselves so traversal can run a fixed number of steps
+        own_index = np.arange(node_count) + offset
+        features.append(np.where(is_leaf, -1, tree.feature).astype(np.int8))
+        thresholds.append(tree.threshold.astype(np.float32))
+        lefts.append(np.where(is_leaf, own_index, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, own_index, tree.children_right + offset).astype(np.int32))
+        # Store the positive-class probability of each leaf
+        counts = tree.value[:, 0, :]
+        proba = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1e-12)
+        positive = list(model.classes_).index(1) if 1 in model.classes_ else proba.shape[1] - 1
+        values.append(proba[:, positive].astype(np.float32))
+        roots.append(offset)
+        offset += node_count
+        max_depth = max(max_depth, tree.max_depth)
+    np.savez_compressed(
+        path,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=np.asarray(max_depth, dtype=np.int32),
+        feature_names=np.asarray(FEATURES)
+    )
 
-# Split the data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def train(chunk_dir='training_data', model_path='video_activity_model.pkl', export_path='video_activity_model.npz', trees_per_chunk=10, max_pending_rows=200000):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+    import joblib
+    from .data_collector import list_chunks, iter_chunks
 
-# Train a Random Forest classifier
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    chunks = list_chunks(chunk_dir)
+    if len(chunks) < 2:
+        raise ValueError(f"Need at least two training chunks in {chunk_dir}, found {len(chunks)}")
 
-# Evaluate the model
-y_pred = model.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
-print(f'Model accuracy: {accuracy:.2f}')
+    # The forest grows by a few trees per chunk, so only one chunk is held in memory at a time.
+    # Chunks with a single label are carried over until a chunk with both labels arrives.
+    model = RandomForestClassifier(n_estimators=0, warm_start=True, random_state=42)
+    pending_X, pending_y = [], []
+    test_chunk = None
+    for index, chunk in enumerate(iter_chunks(chunk_dir)):
+        X = np.column_stack([chunk[name] for name in FEATURES])
+        y = chunk['video_playing']
+        if index == len(chunks) - 1:
+            test_chunk = (X, y)  # Hold out the newest chunk for evaluation
+            break
+        pending_X.append(X)
+        pending_y.append(y)
+        X = np.concatenate(pending_X)
+        y = np.concatenate(pending_y)
+        if len(np.unique(y)) < 2:
+            if len(y) > max_pending_rows:
+                pending_X, pending_y = [X[-max_pending_rows:]], [y[-max_pending_rows:]]
+            continue
+        model.n_estimators += trees_per_chunk
+        model.fit(X, y)
+        pending_X, pending_y = [], []
+        print(f'Trained on chunk {index + 1}/{len(chunks) - 1}: {len(y)} rows, {model.n_estimators} trees')
 
-# Save the trained model
-joblib.dump(model, 'video_activity_model.pkl')
+    if model.n_estimators == 0:
+        raise ValueError("No training chunk contained both labels")
+
+    # Evaluate the model
+    X_test, y_test = test_chunk
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f'Model accuracy: {accuracy:.2f}')
+
+    # Save the trained model and the flattened copy used by the tracker
+    joblib.dump(model, model_path)
+    export_forest(model, export_path)
+    return model
+
+if __name__ == "__main__":
+    train()
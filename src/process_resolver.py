@@ -0,0 +1,90 @@
+import os
+import time
+import threading
+from collections import OrderedDict, namedtuple
+import psutil
+
+# exe_path is None when the executable could not be read (access denied); the name then
+# comes from the process table and the failure is cached with the identity
+ProcessIdentity = namedtuple("ProcessIdentity", ["pid", "create_time", "exe_path", "friendly_name", "description", "version"])
+
+class ProcessResolver:
+    def __init__(self, max_entries=512, version_info=None, failure_ttl=5.0):
+        self.max_entries = max_entries
+        self.version_info = version_info  # Optional exe_path -> (description, version)
+        self.failure_ttl = failure_ttl  # Seconds a PID that could not be resolved is not queried again
+        self.failures = OrderedDict()  # pid -> monotonic time until which resolve returns None
+        self.entries = OrderedDict()  # (pid, create_time) -> ProcessIdentity, in LRU order
+        self.window_owners = OrderedDict()  # hwnd -> (pid, create_time) for the no-syscall fast path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, pid, hwnd=None):
+        # A window belongs to one process for its whole life and a PID cannot be reused while
+        # that process still owns windows, so a known (hwnd, pid) pair needs no process lookup
+        with self.lock:
+            key = self.window_owners.get(hwnd) if hwnd is not None else None
+            if key is not None and key[0] == pid and key in self.entries:
+                self.entries.move_to_end(key)
+                self.window_owners.move_to_end(hwnd)
+                self.hits += 1
+                return self.entries[key]
+            # Short-lived, as the PID may soon belong to a process that can be read
+            if self.failures.get(pid, 0) > time.monotonic():
+                self.hits += 1
+                return None
+        try:
+            process = psutil.Process(pid)
+            key = (pid, process.create_time())
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            self.remember_failure(pid)
+            return None
+        with self.lock:
+            identity = self.entries.get(key)
+            if identity is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+        if identity is None:
+            self.misses += 1
+            identity = self.build_identity(process, key)
+            if identity is None:
+                self.remember_failure(pid)
+                return None
+            with self.lock:
+                self.entries[key] = identity
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        if hwnd is not None:
+            with self.lock:
+                self.window_owners[hwnd] = key
+                if len(self.window_owners) > self.max_entries:
+                    self.window_owners.popitem(last=False)
+        return identity
+
+    def build_identity(self, process, key):
+        try:
+            exe_path = process.exe()
+            friendly_name = os.path.basename(exe_path).rsplit('.', 1)[0]
+        except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+            # Fallback to process name if exe path is not accessible
+            exe_path = None
+            try:
+                friendly_name = process.name().rsplit('.', 1)[0]
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                return None
+        description, version = None, None
+        if exe_path and self.version_info:
+            description, version = self.version_info(exe_path)
+        return ProcessIdentity(key[0], key[1], exe_path, friendly_name, description, version)
+
+    def remember_failure(self, pid):
+        with self.lock:
+            self.failures.pop(pid, None)
+            self.failures[pid] = time.monotonic() + self.failure_ttl
+            if len(self.failures) > self.max_entries:
+                self.failures.popitem(last=False)
+
+    def forget_window(self, hwnd):
+        with self.lock:
+            self.window_owners.pop(hwnd, None)
@@ -0,0 +1,148 @@
+import time
+import threading
+from collections import namedtuple
+import psutil
+
+# Resource use of one application: its root process plus every descendant not owned by another root.
+# io_bytes is cumulative (as io_counters reports it), io_rate is bytes per second since the last sample.
+AppUsage = namedtuple("AppUsage", ["cpu_percent", "io_bytes", "io_rate", "processes"])
+
+class ProcessTree:
+    # Parent/child index of the process table, updated from the PIDs that appeared or
+    # disappeared since the last refresh instead of being rebuilt on every tick
+    def __init__(self, refresh_interval=1.0):
+        self.refresh_interval = refresh_interval
+        self.parents = {}  # pid -> parent pid, None for roots, orphans and processes that could not be read
+        self.children = {}  # pid -> set of child pids
+        self.create_times = {}  # pid -> create time; (pid, create time) is what identifies a process
+        self.processes = {}  # pid -> psutil.Process, only for processes that have been sampled
+        self.last_samples = {}  # pid -> (cpu seconds, io bytes, sample time)
+        self.last_refresh = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        # Returns (added, removed) PIDs
+        current = set(psutil.pids())
+        removed = set(self.parents) - current
+        added = current - set(self.parents)
+        for pid in removed:
+            self.unlink(pid)
+        info = {}
+        for pid in added:
+            try:
+                process = psutil.Process(pid)
+                info[pid] = (process.ppid(), process.create_time())
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                # Recorded as a root without children so it is not queried again on every refresh
+                self.parents[pid] = None
+                self.children.setdefault(pid, set())
+        for pid, (ppid, create_time) in info.items():
+            self.create_times[pid] = create_time
+        for pid, (ppid, create_time) in info.items():
+            self.link(pid, ppid)
+        self.last_refresh = time.time()
+        return added, removed
+
+    def link(self, pid, ppid):
+        # A parent that started after its child is a reused PID, not the real parent
+        parent_time = self.create_times.get(ppid)
+        if ppid == pid or parent_time is None or parent_time > self.create_times[pid]:
+            ppid = None
+        self.parents[pid] = ppid
+        self.children.setdefault(pid, set())
+        if ppid is not None:
+            self.children.setdefault(ppid, set()).add(pid)
+
+    def unlink(self, pid):
+        ppid = self.parents.pop(pid, None)
+        if ppid is not None and ppid in self.children:
+            self.children[ppid].discard(pid)
+        # Windows does not reparent orphans, so the children simply become roots
+        for child in self.children.pop(pid, ()):
+            self.parents[child] = None
+        self.create_times.pop(pid, None)
+        self.processes.pop(pid, None)
+        self.last_samples.pop(pid, None)
+
+    def descendants(self, pid, stop=()):
+        # pid and everything below it, not descending into PIDs in stop
+        result = [pid]
+        stack = [pid]
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                if child not in stop:
+                    result.append(child)
+                    stack.append(child)
+        return result
+
+    def owned(self, roots, exclude=()):
+        # root -> PIDs it owns; a helper under two roots belongs to the nearest one
+        roots = set(roots)
+        stop = roots | set(exclude)
+        return {root: self.descendants(root, stop) for root in roots if root in self.parents and root not in exclude}
+
+    def read(self, pid):
+        process = self.processes.get(pid)
+        try:
+            if process is None:
+                process = psutil.Process(pid)
+                if self.create_times.get(pid, process.create_time()) != process.create_time():
+                    self.forget(pid)
+                    return None
+                self.processes[pid] = process
+            elif not process.is_running():
+                self.forget(pid)
+                return None
+            with process.oneshot():
+                cpu_times = process.cpu_times()
+                io = process.io_counters()
+            return cpu_times.user + cpu_times.system, io.read_bytes + io.write_bytes
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            self.processes.pop(pid, None)
+            return None
+
+    def forget(self, pid):
+        # The PID now belongs to another process: drop the old links and samples and
+        # index it again, with its own parent, on the next refresh
+        self.unlink(pid)
+        self.last_refresh = 0
+
+    def sample(self, owners):
+        # One pass over every owned process; a root without a previous sample is left out
+        now = time.time()
+        result = {}
+        for root, pids in owners.items():
+            cpu_percent, io_bytes, io_rate, count = 0.0, 0, 0.0, 0
+            ready = root in self.last_samples
+            for pid in pids:
+                reading = self.read(pid)
+                if reading is None:
+                    if pid == root:
+                        ready = False
+                    continue
+                cpu_seconds, process_io = reading
+                previous = self.last_samples.get(pid)
+                self.last_samples[pid] = (cpu_seconds, process_io, now)
+                io_bytes += process_io
+                count += 1
+                if previous is None or cpu_seconds < previous[0]:
+                    continue  # New helper (or a reused PID); counted from the next sample on
+                elapsed = max(now - previous[2], 1e-6)
+                cpu_percent += (cpu_seconds - previous[0]) / elapsed * 100
+                io_rate += max(process_io - previous[1], 0) / elapsed
+            if ready:
+                result[root] = AppUsage(cpu_percent, io_bytes, io_rate, count)
+        return result
+
+    def usage(self, roots, wait=0.0, exclude=()):
+        # root -> AppUsage for every root still running. Roots seen for the first time have no
+        # rate yet: with wait > 0 they are primed and sampled again after one shared wait,
+        # otherwise they are left out until the next call.
+        with self.lock:
+            if time.time() - self.last_refresh >= self.refresh_interval or any(root not in self.parents for root in roots):
+                self.refresh()
+            owners = self.owned(roots, exclude)
+            if wait and any(root not in self.last_samples for root in owners):
+                self.sample(owners)
+                time.sleep(wait)
+            return self.sample(owners)
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import logging
+import concurrent.futures
+from collections.abc import Mapping
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Read-only JSON API over tracked time, bound to localhost only.
+#   GET /summary                      live totals per category/app (ETag = tracker sequence)
+#   GET /apps?start=&end=&offset=&limit=   per-app seconds, paginated; start/end (epoch seconds)
+#                                     select a time range from the live journal
+#   GET /top?n=&start=&end=           top-N apps by seconds
+#   GET /changes?since=N&limit=       NDJSON stream of journal entries with sequence > N; 410 once
+#                                     entries after N have been dropped from the journal
+#   GET /history?offset=&limit=       NDJSON stream of stored history rows (ETag = file version)
+# Requests must name 127.0.0.1 or localhost in the Host header, so a web page cannot reach the
+# API by rebinding its own domain to this address.
+
+ALLOWED_HOSTS = {"127.0.0.1", "localhost", "[::1]"}
+
+class SequenceExpired(Exception):
+    def __init__(self, since, dropped):
+        super().__init__(f"Entries after sequence {since} are no longer kept; resume from {dropped} or reload /summary")
+        self.dropped = dropped
+
+class QueryService:
+    def __init__(self, live_state, journal_since, history_file):
+        self.live_state = live_state  # () -> (sequence, {category: {app: {window: seconds}}})
+        # (sequence) -> (dropped, [(sequence, timestamp, category, app, window, seconds)]), where dropped
+        # is the newest sequence already pushed out of the journal (0 while nothing has been)
+        self.journal_since = journal_since
+        self.history_file = history_file
+
+    def app_totals(self, start=None, end=None):
+        # {(category, app): seconds}; with a time range the journal is used instead of the totals
+        totals = {}
+        if start is None and end is None:
+            sequence, apps = self.live_state()
+            for category, app_times in apps.items():
+                for app, window_times in app_times.items():
+                    if isinstance(window_times, Mapping):  # Legacy non-dict entries are skipped
+                        totals[(category, app)] = sum(window_times.values())
+            return sequence, totals
+        sequence = 0
+        for sequence, timestamp, category, app, window, seconds in self.journal_since(0)[1]:
+            if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                totals[(category, app)] = totals.get((category, app), 0) + seconds
+        return sequence, totals
+
+    def apps(self, start=None, end=None, offset=0, limit=100):
+        sequence, totals = self.app_totals(start, end)
+        rows = sorted(totals.items(), key=lambda item: (item[0][0], item[0][1]))
+        items = [{"category": category, "app": app, "seconds": seconds} for (category, app), seconds in rows[offset:offset + limit]]
+        return {"sequence": sequence, "total": len(rows), "offset": offset, "limit": limit, "items": items}
+
+    def top(self, n=10, start=None, end=None):
+        sequence, totals = self.app_totals(start, end)
+        by_app = {}
+        for (category, app), seconds in totals.items():
+            by_app[app] = by_app.get(app, 0) + seconds
+        ranked = sorted(by_app.items(), key=lambda item: item[1], reverse=True)[:n]
+        return {"sequence": sequence, "items": [{"app": app, "seconds": seconds} for app, seconds in ranked]}
+
+    def summary(self):
+        sequence, apps = self.live_state()
+        categories = {category: {app: sum(window_times.values()) for app, window_times in app_times.items()
+                                 if isinstance(window_times, Mapping)}
+                      for category, app_times in apps.items()}
+        return {"sequence": sequence, "categories": categories}
+
+    def changes(self, since, limit=None):
+        # Checked before streaming starts, so a client that fell behind gets an error instead of a gap
+        dropped, entries = self.journal_since(since)
+        if since < dropped:
+            raise SequenceExpired(since, dropped)
+        if limit is not None:
+            entries = entries[:limit]
+        return ({"sequence": sequence, "timestamp": timestamp, "category": category, "app": app, "window": window, "seconds": seconds}
+                for sequence, timestamp, category, app, window, seconds in entries)
+
+    def history_version(self):
+        try:
+            stat = os.stat(self.history_file)
+        except OSError:
+            return "none"
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def history(self, offset=0, limit=None):
+        if not os.path.exists(self.history_file):
+            return
+        with open(self.history_file, "r") as f:
+            history = json.load(f)
+        index = 0
+        for category, app_times in history.items():
+            for app, window_times in app_times.items():
+                if not isinstance(window_times, dict):
+                    continue
+                for window, seconds in window_times.items():
+                    if index >= offset and (limit is None or index < offset + limit):
+                        yield {"category": category, "app": app, "window": window, "seconds": seconds}
+                    index += 1
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not self.host_allowed():
+            self.send_error(403, "Unexpected Host header")
+            return
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        service = self.server.service
+        try:
+            if url.path == "/summary":
+                self.send_json(service.summary())
+            elif url.path == "/apps":
+                self.send_json(service.apps(self.number(query, "start"), self.number(query, "end"),
+                                            int(query.get("offset", 0)), min(int(query.get("limit", 100)), 1000)))
+            elif url.path == "/top":
+                self.send_json(service.top(int(query.get("n", 10)), self.number(query, "start"), self.number(query, "end")))
+            elif url.path == "/changes":
+                since = int(query.get("since", 0))
+                self.send_stream(service.changes(since, self.number(query, "limit", int)), None)
+            elif url.path == "/history":
+                etag = f'"history-{service.history_version()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_not_modified(etag)
+                    return
+                self.send_stream(service.history(int(query.get("offset", 0)), self.number(query, "limit", int)), etag)
+            else:
+                self.send_error(404, "Unknown endpoint")
+        except SequenceExpired as e:
+            self.send_error(410, str(e))
+        except ValueError as e:
+            self.send_error(400, str(e))
+        except concurrent.futures.TimeoutError:
+            self.send_error(503, "Tracker is busy, try again")
+
+    def host_allowed(self):
+        host = self.headers.get("Host", "").lower()
+        name = host[:host.find("]") + 1] if host.startswith("[") else host.partition(":")[0]
+        return name in ALLOWED_HOSTS
+
+    def number(self, query, key, cast=float):
+        return cast(query[key]) if key in query else None
+
+    def send_json(self, payload):
+        # Results keyed on the tracker sequence: unchanged state answers 304 without a body
+        etag = f'"live-{payload["sequence"]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_not_modified(etag)
+            return
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, rows, etag):
+        # Chunked NDJSON so large results never have to be built in memory
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        batch = []
+        for row in rows:
+            batch.append(json.dumps(row))
+            if len(batch) >= 500:
+                self.write_chunk("\n".join(batch) + "\n")
+                batch = []
+        if batch:
+            self.write_chunk("\n".join(batch) + "\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logging.debug(f"Query API: {format % args}")
+
+class QueryApiServer:
+    def __init__(self, service, port, host="127.0.0.1"):
+        self.httpd = ThreadingHTTPServer((host, port), QueryRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = service
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="query-api", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,67 @@
+import sys
+import time
+import threading
+from collections import Counter
+
+class SamplingProfiler:
+    # Statistical profiler: a background thread samples the stacks of the other Python threads
+    # at a fixed interval. Nothing is hooked into the interpreter, so it costs nothing when stopped.
+    def __init__(self, output_path, interval=0.005, thread_names=None):
+        self.output_path = output_path
+        self.interval = interval
+        self.thread_names = thread_names  # Only sample threads with these names; None samples all
+        self.counts = Counter()  # Collapsed stack -> number of samples
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.counts = Counter()
+        self.samples = 0
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Writes the collected stacks and returns the output path, or None if not running
+        if not self.running:
+            return None
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.write(self.output_path)
+        return self.output_path
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, str(thread_id))
+                if self.thread_names is not None and name not in self.thread_names:
+                    continue
+                self.counts[self.collapse(name, frame)] += 1
+            self.samples += 1
+
+    def collapse(self, thread_name, frame):
+        # "thread;outer (file:line);...;inner (file:line)" as used by flamegraph.pl and speedscope
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.append(thread_name)
+        return ";".join(reversed(stack))
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,95 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+
+class SettingsStore:
+    # Dict-like settings that notify subscribers on change and write to disk debounced and atomically
+    def __init__(self, path, values, write_delay=1.0):
+        self.path = path
+        self.values = dict(values)
+        self.write_delay = write_delay  # Seconds of quiet before changes are written
+        self.subscribers = []  # (callback, keys or None)
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()  # Serializes writes so an older copy never lands last
+        self.write_timer = None
+        self.writes = 0
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def items(self):
+        return self.values.items()
+
+    def copy(self):
+        return dict(self.values)
+
+    def subscribe(self, callback, keys=None):
+        # callback(changes) is called with {key: new_value} for the keys that actually changed
+        self.subscribers.append((callback, set(keys) if keys is not None else None))
+
+    def update(self, changes):
+        with self.lock:
+            changed = {key: value for key, value in changes.items() if self.values.get(key) != value}
+            self.values.update(changed)
+        if changed:
+            self.notify(changed)
+            self.schedule_write()
+        return changed
+
+    def reset(self, defaults):
+        with self.lock:
+            changed = {key: value for key, value in defaults.items() if self.values.get(key) != value}
+            self.values = dict(defaults)
+        if changed:
+            self.notify(changed)
+        self.flush()
+
+    def notify(self, changed):
+        for callback, keys in self.subscribers:
+            relevant = changed if keys is None else {key: value for key, value in changed.items() if key in keys}
+            if relevant:
+                callback(relevant)
+
+    def schedule_write(self):
+        with self.lock:
+            if self.write_timer is not None:
+                self.write_timer.cancel()
+            self.write_timer = threading.Timer(self.write_delay, self.flush)
+            self.write_timer.daemon = True
+            self.write_timer.start()
+
+    def flush(self):
+        # Returns False if the file could not be written; the values stay live in memory either way
+        with self.write_lock:
+            with self.lock:
+                if self.write_timer is not None:
+                    self.write_timer.cancel()
+                    self.write_timer = None
+                values = dict(self.values)
+            # Unique temp file in the same directory: the GUI and the collector daemon may both
+            # write this file, and the rename over the original keeps readers from partial files
+            directory = os.path.dirname(os.path.abspath(self.path))
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    json.dump(values, f)
+                os.replace(temp_path, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                logging.error(f"Error writing settings to {self.path}: {e}")
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return False
+            self.writes += 1
+            return True
@@ -0,0 +1,36 @@
+from types import MappingProxyType
+from collections import namedtuple
+from collections.abc import Mapping
+
+# Published tracker state. apps is {category: {app: {window: seconds}}} with every level a
+# read-only MappingProxyType over a dict nobody else holds, so a snapshot never changes once
+# published. A new snapshot copies only the path to the app that changed and shares every other
+# mapping with the previous one; the tracker swaps the reference in one assignment, so readers
+# on any thread just take the current snapshot, without locks or copies.
+Snapshot = namedtuple("Snapshot", ["sequence", "apps"])
+
+EMPTY = MappingProxyType({})
+
+def freeze(apps):
+    # Plain nested dicts (e.g. loaded history) -> read-only mappings; malformed app entries are kept as is
+    return MappingProxyType({
+        category: MappingProxyType({
+            app: MappingProxyType(dict(window_times)) if isinstance(window_times, Mapping) else window_times
+            for app, window_times in app_times.items()
+        })
+        for category, app_times in apps.items()
+    })
+
+def thaw(apps):
+    # Read-only mappings -> plain nested dicts, for pickling (IPC) or mutation
+    return {category: {app: dict(window_times) if isinstance(window_times, Mapping) else window_times
+                       for app, window_times in app_times.items()}
+            for category, app_times in apps.items()}
+
+def replace_app(apps, category, app, window_times):
+    # New apps mapping with one app's windows replaced; window_times must not be changed afterwards
+    app_times = dict(apps.get(category, EMPTY))
+    app_times[app] = MappingProxyType(window_times)
+    updated = dict(apps)
+    updated[category] = MappingProxyType(app_times)
+    return MappingProxyType(updated)
@@ -0,0 +1,117 @@
+import re
+import logging
+from collections import OrderedDict
+
+# (pattern, replacement) applied in order; settings["title_rules"] replaces this list
+DEFAULT_TITLE_RULES = [
+    (r"^\(\d+\+?\)\s*", ""),                 # Unread counters: "(3) Inbox"
+    (r"^[●•*]\s*", ""),             # Unsaved markers: "● file.py", "*file.txt"
+    (r"\s*[●•*]$", ""),             # Trailing unsaved markers
+    (r"\s*\[\d+\]$", ""),                    # Trailing counters: "Chat [2]"
+    (r"\s+-\s+\d+\s+(new|unread)\b.*$", ""),  # "Mail - 5 unread messages"
+    (r"\s{2,}", " ")
+]
+
+OTHER_WINDOWS = "Other windows"
+
+class TitleNormalizer:
+    def __init__(self, rules=None, cache_size=4096):
+        self.rules = []
+        for rule in (rules if rules is not None else DEFAULT_TITLE_RULES):
+            # A bad rule in the settings file is skipped rather than stopping the tracker
+            try:
+                pattern, replacement = rule
+                self.rules.append((re.compile(pattern, re.IGNORECASE), replacement))
+            except (re.error, TypeError, ValueError) as e:
+                logging.warning(f"Skipping invalid title rule {rule!r}: {e}")
+        self.cache = OrderedDict()  # LRU of raw title -> canonical title
+        self.cache_size = cache_size
+
+    def normalize(self, title):
+        if title in self.cache:
+            self.cache.move_to_end(title)
+            return self.cache[title]
+        canonical = title
+        for pattern, replacement in self.rules:
+            canonical = pattern.sub(replacement, canonical)
+        canonical = canonical.strip() or title
+        self.cache[title] = canonical
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return canonical
+
+class HeavyHitters:
+    # Space-Saving summary: tracks at most `capacity` keys and their (over-)estimated weights
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.weights = {}
+        self.errors = {}  # key -> weight inherited from the key it replaced
+
+    def add(self, key, weight):
+        if key in self.weights or len(self.weights) < self.capacity:
+            self.weights[key] = self.weights.get(key, 0) + weight
+            return None
+        # Replace the lightest key; it inherits that weight as its error bound
+        evicted = min(self.weights, key=self.weights.get)
+        self.errors.pop(evicted, None)
+        self.errors[key] = self.weights.pop(evicted)
+        self.weights[key] = self.errors[key] + weight
+        return evicted
+
+    def guaranteed(self, key):
+        # Weight actually added for key since it was last admitted
+        return self.weights.get(key, 0) - self.errors.get(key, 0)
+
+    def discard(self, key):
+        self.weights.pop(key, None)
+        self.errors.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.weights
+
+class TitleCap:
+    # Keeps the top-K titles per app; anything else is folded into OTHER_WINDOWS. Titles that
+    # are not shown are candidates in a Space-Saving summary, and one replaces the lightest shown
+    # title only once the time it was really seen for exceeds that title's exact total.
+    def __init__(self, max_titles):
+        self.max_titles = max_titles
+        self.candidates = {}  # (category, app) -> HeavyHitters
+
+    def add(self, category, app, title, elapsed_time, window_times):
+        # window_times is the app's {title: seconds}, updated in place.
+        # Returns the titles whose entries were removed by folding them into OTHER_WINDOWS.
+        folded = []
+        if self.max_titles <= 0 or title == OTHER_WINDOWS:
+            window_times[title] = window_times.get(title, 0) + elapsed_time
+            return folded
+        if len(window_times) - (OTHER_WINDOWS in window_times) > self.max_titles:
+            # Apps loaded from history (or a lowered cap) may show too many titles; the lightest go first
+            shown = sorted((t for t in window_times if t != OTHER_WINDOWS), key=window_times.get)
+            for lightest in shown[:len(shown) - self.max_titles]:
+                self.fold(lightest, window_times, folded)
+        if title in window_times:
+            window_times[title] += elapsed_time
+            return folded
+        if len(window_times) - (OTHER_WINDOWS in window_times) < self.max_titles:
+            window_times[title] = elapsed_time
+            return folded
+        # Until it is promoted the newcomer's time is counted in the shared bucket
+        window_times[OTHER_WINDOWS] = window_times.get(OTHER_WINDOWS, 0) + elapsed_time
+        candidates = self.candidates.setdefault((category, app), HeavyHitters(self.max_titles))
+        candidates.add(title, elapsed_time)
+        earned = candidates.guaranteed(title)
+        lightest = min((t for t in window_times if t != OTHER_WINDOWS), key=window_times.get)
+        if earned > window_times[lightest]:
+            candidates.discard(title)
+            self.fold(lightest, window_times, folded)
+            window_times[OTHER_WINDOWS] -= earned
+            window_times[title] = earned
+        return folded
+
+    def fold(self, title, window_times, folded):
+        # The displaced title's time moves into the shared bucket
+        window_times[OTHER_WINDOWS] = window_times.get(OTHER_WINDOWS, 0) + window_times.pop(title)
+        folded.append(title)
+
+    def reset(self):
+        self.candidates = {}
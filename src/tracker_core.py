@@ -0,0 +1,429 @@
+import asyncio
+import time
+import itertools
+import concurrent.futures
+from collections import deque
+from collections.abc import Mapping
+import os
+import socket
+import threading
+import pythoncom
+from concurrent.futures import ThreadPoolExecutor
+from .app_tracker_utils import app_tracker_utils, load_session_data, save_session_data, DATA_FILE
+from .config import settings, FILE_PATHS
+from .data_collector import TrainingDataCollector
+from .fleet_client import FleetUploader, parse_address
+from .title_normalizer import TitleNormalizer, TitleCap, OTHER_WINDOWS
+from .query_api import QueryService, QueryApiServer
+from .wakeup_meter import WakeupMeter
+from .state_snapshot import Snapshot, EMPTY, freeze, replace_app
+
+class TrackerCore:
+    # Qt-free asyncio tracker shared by the in-process TrackerThread and the collector daemon.
+    # Sampling, saving and window logging run as tasks on one event loop; blocking win32/psutil
+    # calls go through a small bounded executor. File watching blocks indefinitely, so it has
+    # a thread of its own.
+    def __init__(self, on_status=None, on_update=None, on_debug=None):
+        self.on_status = on_status or (lambda text: None)
+        self.on_update = on_update or (lambda apps, changes: None)  # changes: {(category, app, window): seconds}
+        self.on_debug = on_debug or (lambda lines: None)  # lines: debug entries logged since the last update
+        self.running = True
+        self.loop = None
+        self.stop_event = None
+        self.executor = None
+        self.max_workers = 4  # Upper bound on OS threads used for blocking calls
+        self.scoring_future = None  # Activity scoring in flight; a new one is not started until it finishes
+        self.passive_activity = False  # Latest scoring result while the user is inactive (e.g. video playing)
+        self.scoring_started_inactive = False
+        self.scored_while_inactive = False
+        self.deep_idle = False
+        self.wake_event = None  # Set by input (or stop) to end deep idle
+        self.awake_event = None  # Cleared while in deep idle; periodic tasks wait on it
+        self.watcher_awake = threading.Event()  # awake_event for the file watcher thread
+        self.watcher_awake.set()
+        self.file_watcher = None
+        self.wakeup_meter = WakeupMeter()
+        self.last_saved_sequence = 0
+        self.last_check_time = time.time()
+        self.inactivity_check_interval = 0.5  # Increase the frequency of checking
+        self.last_ui_update = time.time()
+        self.session_save_interval = 10.0
+        self.window_log_interval = 10.0  # Log all open windows this often
+        self.baseline_flush_interval = 60.0  # Persist learned baselines and sampling intervals this often
+        self.last_baseline_flush = time.time()
+        self.default_interval = 0.1  # Default sampling interval
+        self.last_collector_sample = time.time()
+        self.changed_windows = set()  # (category, app, window) keys updated since the last UI update
+        self.ui_visible = True  # While False no UI payloads are built or emitted
+        self.last_debug_count = 0
+        # Current state; replaced (never changed) on the loop thread and read from any thread.
+        # The sequence is incremented for every accounted time slice and on reset.
+        self.snapshot = Snapshot(0, freeze(load_session_data()))
+        self.journal = deque(maxlen=settings.get("query_journal_size", 100000))  # (sequence, timestamp, category, app, window, seconds)
+        self.journal_dropped = 0  # Newest sequence pushed out of the full journal
+        self.title_normalizer = TitleNormalizer(settings.get("title_rules"))
+        self.title_cap = TitleCap(settings.get("max_titles_per_app", 50))
+        self.collector = None
+        if settings.get("collect_training_data", False):
+            self.collector = TrainingDataCollector(FILE_PATHS["TRAINING_DATA_DIR"], log=app_tracker_utils.log_debug)
+        self.uploader = None
+        if settings.get("fleet_server"):
+            self.uploader = FleetUploader(parse_address(settings["fleet_server"]), socket.gethostname(),
+                                          FILE_PATHS["FLEET_STATE_FILE"], settings.get("fleet_upload_interval", 60),
+                                          log=app_tracker_utils.log_debug, token=settings.get("fleet_token") or None)
+        self.query_api = None
+        if settings.get("query_api_port"):
+            service = QueryService(self.live_state, self.journal_since, DATA_FILE)
+            self.query_api = QueryApiServer(service, settings["query_api_port"])
+
+    async def run(self):
+        self.stop_event = asyncio.Event()
+        self.wake_event = asyncio.Event()
+        self.awake_event = asyncio.Event()
+        self.awake_event.set()
+        self.loop = asyncio.get_running_loop()
+        app_tracker_utils.add_input_listener(self.notify_input)
+        if not self.running:
+            return  # Stopped before the loop came up
+        pythoncom.CoInitialize()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tracker",
+                                           initializer=pythoncom.CoInitialize)
+        app_tracker_utils.log_debug("Tracker thread started.")
+        if self.collector:
+            self.collector.start()
+        if self.uploader:
+            self.uploader.start()
+        if self.query_api:
+            self.query_api.start()
+            app_tracker_utils.log_debug(f"Query API listening on 127.0.0.1:{self.query_api.port}")
+
+        # Watch file changes in the user's home directory
+        self.file_watcher = threading.Thread(target=self.watch_files, args=(os.path.expanduser("~"),),
+                                             name="file-watcher", daemon=True)
+        self.file_watcher.start()
+        tasks = [
+            asyncio.ensure_future(self.keep_running(self.sample_loop)),
+            asyncio.ensure_future(self.keep_running(self.save_loop)),
+            asyncio.ensure_future(self.keep_running(self.window_log_loop))
+        ]
+        try:
+            await self.stop_event.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception) and not isinstance(result, asyncio.CancelledError):
+                    app_tracker_utils.log_debug(f"Tracker task failed: {result}", error=True)
+            await self.shutdown()
+
+    async def shutdown(self):
+        if self.file_watcher:
+            await self.run_blocking(self.file_watcher.join)
+        if self.query_api:
+            await self.run_blocking(self.query_api.stop)
+        if self.collector:
+            await self.run_blocking(self.collector.stop)
+        if self.uploader:
+            await self.run_blocking(self.uploader.stop)
+        await self.run_blocking(save_session_data, self.snapshot.apps)
+        await self.run_blocking(app_tracker_utils.save_baselines)
+        self.executor.shutdown(wait=True)
+        pythoncom.CoUninitialize()
+
+    async def keep_running(self, loop_function):
+        # A failing loop is logged and started again instead of ending with nothing but a
+        # result nobody looks at until shutdown
+        while self.running:
+            try:
+                await loop_function()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_tracker_utils.log_debug(f"Tracker task {loop_function.__name__} failed, restarting it: {e!r}", error=True)
+                await self.sleep(1.0)
+
+    def run_blocking(self, func, *args):
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    async def sleep(self, seconds):
+        # Returns early when stop() is called
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def sample_loop(self):
+        while self.running:
+            # Get the active application and window title
+            new_app, new_pid, window_title = await self.run_blocking(app_tracker_utils.get_active_app)
+            current_time = time.time()
+
+            # Log and update the current application if it has changed
+            if new_app and new_app != app_tracker_utils.current_app:
+                app_tracker_utils.log_debug(f"Switched to application: {new_app} - {window_title}")
+                app_tracker_utils.current_app = new_app
+
+            # Update user activity status
+            app_tracker_utils.update_user_activity()
+            self.wakeup_meter.wakeup()
+
+            # Collect the result of the last activity check made while the user was inactive
+            if app_tracker_utils.user_active:
+                self.passive_activity = False
+                self.scored_while_inactive = False
+            elif self.scoring_future is not None and self.scoring_future.done() and self.scoring_started_inactive:
+                self.passive_activity = self.scoring_future.exception() is None and bool(self.scoring_future.result())
+                self.scored_while_inactive = True
+
+            if self.should_deep_idle(new_pid):
+                await self.enter_deep_idle(new_pid)
+                continue
+
+            # Update the active application tracking data
+            if app_tracker_utils.current_app:
+                elapsed_time = current_time - self.last_check_time
+                if window_title:
+                    window_title = self.title_normalizer.normalize(window_title)
+                    app_tracker_utils.last_window_title = window_title
+                else:
+                    window_title = app_tracker_utils.last_window_title
+                category = app_tracker_utils.categorize_activity(window_title)
+                self.add_elapsed(category, app_tracker_utils.current_app, window_title, elapsed_time)
+                app_tracker_utils.log_debug(f"Updated active app: {app_tracker_utils.current_app}, window: {window_title}, elapsed time: {elapsed_time}")
+
+            # Check activity based on resource usage and other metrics, at most one check in flight
+            if self.scoring_future is None or self.scoring_future.done():
+                self.scoring_started_inactive = not app_tracker_utils.user_active
+                if not app_tracker_utils.user_active and new_pid:
+                    self.scoring_future = self.run_blocking(app_tracker_utils.is_application_active, new_pid, new_pid == app_tracker_utils.current_app)
+                elif current_time - self.last_check_time >= 1.0:
+                    # Periodically check background activity
+                    self.scoring_future = self.run_blocking(app_tracker_utils.check_background_activity)
+
+            self.last_check_time = current_time
+
+            # Queue a labeled training sample of all known PIDs once per second
+            if self.collector and current_time - self.last_collector_sample >= 1.0:
+                self.collector.record(current_time, list(app_tracker_utils.known_active_apps), new_pid,
+                                      app_tracker_utils.recent_interactions(), settings.get("training_label", 0))
+                self.last_collector_sample = current_time
+
+            # Update the UI and debug log every second
+            if current_time - self.last_ui_update >= 1.0:
+                self.publish()
+                self.last_ui_update = current_time
+
+            # Sleep based on user activity and the sampling interval of the current application
+            activity_delay = 0.1 if app_tracker_utils.user_active else self.inactivity_check_interval
+            sampling_interval = app_tracker_utils.get_sampling_interval(new_pid) if new_pid else self.default_interval
+            await self.sleep(activity_delay + sampling_interval)
+
+    def should_deep_idle(self, pid):
+        # Only after at least one activity check since the user went inactive, so a playing
+        # video keeps the tracker awake
+        return (settings.get("deep_idle_enabled", True) and not app_tracker_utils.user_active
+                and not self.passive_activity and (self.scored_while_inactive or not pid))
+
+    async def enter_deep_idle(self, pid):
+        # Nothing is polled, sampled or emitted until input arrives; a long heartbeat only
+        # checks whether the last foreground app became passively active (e.g. a video started)
+        heartbeat = settings.get("deep_idle_heartbeat", 300)
+        entered = time.time()
+        self.deep_idle = True
+        self.awake_event.clear()
+        self.watcher_awake.clear()
+        self.wake_event.clear()
+        self.wakeup_meter.enter("deep_idle")
+        app_tracker_utils.log_debug(f"Entering deep idle (wakeups/hour: {self.format_wakeup_rates()})")
+        self.publish()
+        self.on_status("Idle")
+        try:
+            while self.running:
+                # Input that arrived before deep_idle was set never reached notify_input
+                app_tracker_utils.update_user_activity()
+                if app_tracker_utils.user_active:
+                    break
+                try:
+                    await asyncio.wait_for(self.wake_event.wait(), heartbeat)
+                    break  # Input or stop
+                except asyncio.TimeoutError:
+                    self.wakeup_meter.wakeup()
+                if pid and await self.run_blocking(app_tracker_utils.is_application_active, pid, True):
+                    self.passive_activity = True
+                    break
+        finally:
+            self.deep_idle = False
+            # The check from before idling is stale; harvesting it would undo a heartbeat detection
+            self.scoring_future = None
+            self.wakeup_meter.enter("active")
+            # Time spent away is not credited to the app that happened to be in front
+            self.last_check_time = time.time()
+            app_tracker_utils.update_user_activity()
+            self.awake_event.set()
+            self.watcher_awake.set()
+            app_tracker_utils.log_debug(f"Leaving deep idle after {time.time() - entered:.0f}s (wakeups/hour: {self.format_wakeup_rates()})")
+
+    def notify_input(self):
+        # Called on the input hook threads; only crosses into the loop when it is asleep
+        if self.deep_idle:
+            self.call_soon(self.wake_event.set)
+
+    def format_wakeup_rates(self):
+        return ", ".join(f"{state}={rate:.0f}" for state, rate in sorted(self.wakeup_meter.rates().items()))
+
+    async def save_loop(self):
+        # Save session data every 10 seconds, skipping saves when nothing was accounted;
+        # learned baselines are flushed less often
+        while self.running:
+            await self.sleep(self.session_save_interval)
+            await self.awake_event.wait()
+            self.wakeup_meter.wakeup()
+            snapshot = self.snapshot
+            if snapshot.sequence != self.last_saved_sequence:
+                self.last_saved_sequence = snapshot.sequence
+                await self.run_blocking(save_session_data, snapshot.apps)
+            if time.time() - self.last_baseline_flush >= self.baseline_flush_interval:
+                self.last_baseline_flush = time.time()
+                await self.run_blocking(app_tracker_utils.save_baselines)
+
+    async def window_log_loop(self):
+        # Log all open windows every 10 seconds for debugging purposes
+        while self.running:
+            await self.sleep(self.window_log_interval)
+            await self.awake_event.wait()
+            self.wakeup_meter.wakeup()
+            await self.run_blocking(app_tracker_utils.log_all_open_windows)
+
+    def watch_files(self, directory):
+        # File watcher thread. The handle is closed here, once the last wait on it has returned;
+        # shutdown joins the thread, which ends within one wait after stop().
+        try:
+            change_handle = app_tracker_utils.open_change_notification(directory)
+        except Exception as e:
+            app_tracker_utils.log_debug(f"Cannot watch {directory}: {e}", error=True)
+            return
+        try:
+            while self.running:
+                self.watcher_awake.wait()
+                if self.running and app_tracker_utils.wait_for_change(change_handle, 500):
+                    app_tracker_utils.log_debug(f"Change detected in directory: {directory}")
+        finally:
+            app_tracker_utils.close_change_notification(change_handle)
+
+    def add_elapsed(self, category, app, window_title, elapsed_time):
+        # Copy-on-write: only the changed app's windows are copied, everything else is shared
+        apps = self.snapshot.apps
+        window_times = apps.get(category, EMPTY).get(app)
+        window_times = dict(window_times) if isinstance(window_times, Mapping) else {}
+        folded = self.title_cap.add(category, app, window_title, elapsed_time, window_times)
+        self.changed_windows.add((category, app, window_title))
+        for title in folded:
+            self.changed_windows.add((category, app, title))
+        if folded or window_title not in window_times:
+            # Folded titles and candidates that are not shown yet are counted in the shared bucket
+            self.changed_windows.add((category, app, OTHER_WINDOWS))
+        if self.uploader:
+            self.uploader.add(category, app, window_title, elapsed_time)
+        sequence = self.snapshot.sequence + 1
+        if len(self.journal) == self.journal.maxlen:
+            self.journal_dropped = self.journal[0][0]
+        self.journal.append((sequence, time.time(), category, app, window_title, elapsed_time))
+        self.snapshot = Snapshot(sequence, replace_app(apps, category, app, window_times))
+
+    def call_in_loop(self, func, timeout=5.0):
+        # Runs func on the tracker loop and waits for its result, so readers on other
+        # threads see state between two ticks rather than halfway through one
+        if self.loop is None or self.loop.is_closed():
+            return func()
+        future = concurrent.futures.Future()
+        def call():
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+        self.loop.call_soon_threadsafe(call)
+        return future.result(timeout)
+
+    def live_state(self):
+        snapshot = self.snapshot
+        return snapshot.sequence, snapshot.apps
+
+    def journal_since(self, since):
+        def entries():
+            # Binary search; resets leave gaps in the sequence numbers
+            low, high = 0, len(self.journal)
+            while low < high:
+                middle = (low + high) // 2
+                if self.journal[middle][0] <= since:
+                    low = middle + 1
+                else:
+                    high = middle
+            return self.journal_dropped, list(itertools.islice(self.journal, low, None))
+        return self.call_in_loop(entries)
+
+    def take_changes(self):
+        # Absolute totals of every window touched since the last call, so applying them is idempotent.
+        # None marks a window that no longer exists (folded into OTHER_WINDOWS).
+        apps = self.snapshot.apps
+        changes = {}
+        for category, app, window_title in self.changed_windows:
+            changes[(category, app, window_title)] = apps.get(category, {}).get(app, {}).get(window_title)
+        self.changed_windows = set()
+        return changes
+
+    def take_debug_lines(self):
+        count = app_tracker_utils.debug_log_count
+        new_lines = min(count - self.last_debug_count, len(app_tracker_utils.debug_logs))
+        self.last_debug_count = count
+        return app_tracker_utils.debug_logs[-new_lines:] if new_lines > 0 else []
+
+    def set_ui_visible(self, visible):
+        # Safe to call from the GUI thread
+        self.call_soon(self.apply_ui_visible, visible)
+
+    def apply_ui_visible(self, visible):
+        if visible == self.ui_visible:
+            return
+        self.ui_visible = visible
+        app_tracker_utils.log_debug(f"UI {'visible, sending catch-up snapshot' if visible else 'hidden, updates suspended'}")
+        if visible:
+            # One catch-up: the snapshot already holds everything accounted while hidden
+            self.publish()
+
+    def publish(self):
+        if not self.ui_visible:
+            return
+        self.on_status(f"Tracking: {app_tracker_utils.current_app}")
+        self.on_update(self.snapshot.apps, self.take_changes())
+        self.on_debug(self.take_debug_lines())
+        app_tracker_utils.log_debug("Emitted update signals.")
+
+    def call_soon(self, func, *args):
+        # Run func on the tracker loop; safe to call from the GUI or IPC threads
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def reset(self):
+        self.call_soon(self.reset_state)
+
+    def save_session(self, apps):
+        # On the loop: writes apps now and marks the current state as saved, so save_loop does not
+        # write a state cleared after taking apps over them until something new is tracked
+        self.last_saved_sequence = self.snapshot.sequence
+        return self.run_blocking(save_session_data, apps)
+
+    def reset_state(self):
+        self.snapshot = Snapshot(self.snapshot.sequence + 1, EMPTY)
+        self.changed_windows = set()
+        self.title_cap.reset()
+
+    def stop(self):
+        app_tracker_utils.log_debug("Tracker thread stopped.")
+        self.running = False
+        self.watcher_awake.set()
+        if self.stop_event is not None:
+            self.call_soon(self.stop_event.set)
+            self.call_soon(self.wake_event.set)
@@ -0,0 +1,27 @@
+import time
+
+class WakeupMeter:
+    # Counts loop wakeups per tracker state so wakeups/hour can be compared between states
+    def __init__(self, state="active"):
+        self.state = state
+        self.state_started = time.monotonic()
+        self.wakeups = {}  # state -> wakeups
+        self.seconds = {}  # state -> seconds spent in the state (excluding the current stretch)
+
+    def wakeup(self):
+        self.wakeups[self.state] = self.wakeups.get(self.state, 0) + 1
+
+    def enter(self, state):
+        now = time.monotonic()
+        self.seconds[self.state] = self.seconds.get(self.state, 0) + now - self.state_started
+        self.state = state
+        self.state_started = now
+
+    def rates(self):
+        # state -> wakeups per hour
+        now = time.monotonic()
+        result = {}
+        for state in set(self.wakeups) | set(self.seconds) | {self.state}:
+            seconds = self.seconds.get(state, 0) + (now - self.state_started if state == self.state else 0)
+            result[state] = self.wakeups.get(state, 0) / seconds * 3600 if seconds > 0 else 0.0
+        return result
@@ -0,0 +1,46 @@
+import threading
+
+class WindowInventory:
+    # Last known set of visible top-level windows, refreshed by diffing full enumerations
+    def __init__(self, enumerate_windows):
+        self.enumerate_windows = enumerate_windows  # () -> iterable of (hwnd, pid, title)
+        self.lock = threading.Lock()
+        self.windows = {}  # hwnd -> (pid, title)
+        self.windows_by_pid = {}  # pid -> set of hwnds
+        self.populated = False
+
+    def refresh(self):
+        # Returns (opened, closed, retitled) as lists of (hwnd, pid, title);
+        # retitled entries carry (hwnd, pid, old_title, new_title)
+        current = {hwnd: (pid, title) for hwnd, pid, title in self.enumerate_windows()}
+        opened, closed, retitled = [], [], []
+        with self.lock:
+            for hwnd, (pid, title) in current.items():
+                previous = self.windows.get(hwnd)
+                if previous is None or previous[0] != pid:
+                    if previous is not None:
+                        closed.append((hwnd, previous[0], previous[1]))  # Handle reused by another process
+                    opened.append((hwnd, pid, title))
+                elif previous[1] != title:
+                    retitled.append((hwnd, pid, previous[1], title))
+            for hwnd, (pid, title) in self.windows.items():
+                if hwnd not in current:
+                    closed.append((hwnd, pid, title))
+            for hwnd, pid, _ in closed:
+                hwnds = self.windows_by_pid.get(pid)
+                if hwnds is not None:
+                    hwnds.discard(hwnd)
+                    if not hwnds:
+                        del self.windows_by_pid[pid]
+            for hwnd, pid, _ in opened:
+                self.windows_by_pid.setdefault(pid, set()).add(hwnd)
+            self.windows = current
+            self.populated = True
+        return opened, closed, retitled
+
+    def has_windows(self, pid):
+        # A PID that still owns a window belongs to a running process
+        return pid in self.windows_by_pid
+
+    def __len__(self):
+        return len(self.windows)
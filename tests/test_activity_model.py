@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from src.activity_model import ActivityModel, load_activity_model
+
+@pytest.fixture
+def model():
+    # Two stumps: tree 0 splits on cpu_usage <= 10, tree 1 on user_interactions <= 0
+    return ActivityModel(
+        feature=np.array([0, -1, -1, 2, -1, -1], dtype=np.int8),
+        threshold=np.array([10, 0, 0, 0, 0, 0], dtype=np.float32),
+        left=np.array([1, 1, 2, 4, 4, 5], dtype=np.int32),
+        right=np.array([2, 1, 2, 5, 4, 5], dtype=np.int32),
+        value=np.array([0, 0.0, 1.0, 0, 1.0, 0.0], dtype=np.float32),
+        roots=np.array([0, 3], dtype=np.int32),
+        max_depth=1
+    )
+
+def test_predict_proba_batch(model):
+    proba = model.predict_proba([[50, 0, 0, 1], [5, 0, 3, 1], [50, 0, 3, 0]])
+    assert proba.tolist() == [1.0, 0.0, 0.5]
+
+def test_predict_single_sample(model):
+    assert model.predict([50, 0, 0, 0]).tolist() == [True]
+
+def test_load_activity_model_missing_file(tmp_path):
+    assert load_activity_model(str(tmp_path / "missing.npz")) is None
+
+def test_export_forest_matches_sklearn(tmp_path):
+    ensemble = pytest.importorskip("sklearn.ensemble")
+    from src.ml_model import export_forest
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, size=(200, 4))
+    y = (X[:, 0] > 40).astype(int)
+    forest = ensemble.RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    path = tmp_path / "model.npz"
+    export_forest(forest, path)
+    exported = ActivityModel.load(path)
+    expected = forest.predict_proba(X)[:, 1]
+    assert np.allclose(exported.predict_proba(X), expected, atol=1e-5)
@@ -0,0 +1,41 @@
+import os
+from src.baseline_store import BaselineStore, identity_key
+from src.process_resolver import ProcessIdentity
+
+ENTRY = {"cpu": [1.0, 2.0], "io": [10.0, 20.0], "thresholds": {"cpu": 1.95, "io": 19.5}, "interval": 4.0}
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    store = BaselineStore(path)
+    assert store.get("editor") is None
+    store.put("editor", ENTRY)
+    assert store.flush()
+    assert not store.flush()  # Nothing changed since the last write
+    store.put("editor", dict(ENTRY))
+    assert not store.flush()
+    entry = BaselineStore(path).get("editor")
+    assert entry["interval"] == 4.0 and entry["thresholds"] == ENTRY["thresholds"]
+
+def test_least_recently_seen_are_dropped(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    store = BaselineStore(path, max_entries=2)
+    for seen, key in enumerate(["a", "b", "c"]):
+        store.put(key, ENTRY)
+        store.entries[key]["seen"] = seen
+    store.flush()
+    assert sorted(BaselineStore(path).load()) == ["b", "c"]
+
+def test_identity_key_prefers_the_executable():
+    exe = os.path.join("Apps", "Editor.exe")
+    assert identity_key(ProcessIdentity(1, 1.0, exe, "Editor", None, None)) == os.path.normcase(exe)
+    assert identity_key(ProcessIdentity(1, 1.0, None, "Editor", None, None)) == "name:Editor"
+
+def test_lookup_keeps_an_unchanged_entry_recent(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    store = BaselineStore(path, max_entries=2)
+    for seen, key in enumerate(["stable", "b", "c"]):
+        store.put(key, ENTRY)
+        store.entries[key]["seen"] = seen
+    store.get("stable")  # Started again, learned nothing new
+    assert store.flush()
+    assert sorted(BaselineStore(path).load()) == ["c", "stable"]
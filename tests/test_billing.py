@@ -0,0 +1,48 @@
+import pytest
+from src.billing import BillingEngine, round_seconds
+
+APPS = {
+    "Development": {"code": {"a.py": 1800.5, "b.py": 1800.5}},
+    "Browsing": {"chrome": {"Docs": 3600, "News": 600}}
+}
+
+def test_select_app_uses_raw_seconds():
+    engine = BillingEngine(APPS, 10)
+    engine.select_app("Development", "code", True)
+    assert engine.total_seconds() == 3601
+    assert engine.total_amount() == pytest.approx(3601 / 3600 * 10)
+
+def test_select_windows_and_wage_change():
+    engine = BillingEngine(APPS, 10)
+    engine.select_window("Browsing", "chrome", "Docs", True)
+    engine.select_window("Browsing", "chrome", "News", True)
+    engine.select_window("Browsing", "chrome", "News", False)
+    assert engine.total_amount() == pytest.approx(10)
+    engine.set_hourly_wage(20)
+    assert engine.total_amount() == pytest.approx(20)
+
+def test_app_selection_overrides_windows():
+    engine = BillingEngine(APPS, 10)
+    engine.select_window("Browsing", "chrome", "News", True)
+    engine.select_app("Browsing", "chrome", True)
+    assert engine.total_seconds() == 4200
+    engine.select_app("Browsing", "chrome", False)
+    assert engine.total_seconds() == 0
+
+def test_rates_and_rounding():
+    engine = BillingEngine(APPS, 10, category_rates={"Browsing": 30}, app_rates={"code": 60},
+                           rounding={"increment_minutes": 15, "mode": "up"})
+    engine.select_all()
+    # code: 3601s rounds up to 4500s at 60/h; chrome: 4200s rounds up to 4500s at 30/h
+    assert engine.total_amount() == pytest.approx(75 + 37.5)
+    lines = {line["app"]: line for line in engine.lines()}
+    assert lines["code"]["billed_seconds"] == 4500
+    assert lines["chrome"]["rate"] == 30
+
+def test_round_seconds_modes():
+    rounding = {"increment_minutes": 6}
+    assert round_seconds(1, rounding) == 360
+    assert round_seconds(500, {**rounding, "mode": "down"}) == 360
+    assert round_seconds(500, {**rounding, "mode": "nearest"}) == 360
+    assert round_seconds(0, rounding) == 0
+    assert round_seconds(42.5, None) == 42.5
@@ -0,0 +1,42 @@
+import os
+import stat
+import time
+from multiprocessing.connection import Pipe
+from src.collector_protocol import ClientWriter, send_message, recv_message, encode_changes, decode_changes
+from src.config import load_collector_authkey
+
+def test_messages_are_json():
+    left, right = Pipe()
+    changes = {("Browsing", "chrome", "Inbox"): 12.5, ("Other", "notepad", "x"): None}
+    send_message(left, ["delta", 3, encode_changes(changes)])
+    kind, version, rows = recv_message(right)
+    assert (kind, version, decode_changes(rows)) == ("delta", 3, changes)
+    left.send_bytes(b"\x80\x04 not json")
+    try:
+        recv_message(right)
+        assert False, "pickle data must not be accepted"
+    except ValueError:
+        pass
+
+def test_authkey_is_random_and_private(tmp_path):
+    path = str(tmp_path / "collector.key")
+    key = load_collector_authkey(path)
+    assert len(key) == 32 and load_collector_authkey(path) == key
+    if os.name != "nt":
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert load_collector_authkey(str(tmp_path / "other.key")) != key
+
+def test_stalled_client_does_not_block_the_sender():
+    left, right = Pipe()
+    closed = []
+    writer = ClientWriter(left, closed.append, queue_size=2)
+    # Not started: nothing drains the queue, like a client that stopped reading
+    started = time.time()
+    assert writer.put(["status", "a"]) and writer.put(["status", "b"])
+    assert not writer.put(["status", "c"])
+    assert time.time() - started < 1
+    writer.start()
+    assert recv_message(right) == ["status", "a"]
+    writer.close()
+    writer.thread.join(2)
+    assert closed == [writer]
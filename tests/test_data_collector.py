@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pytest
+from src.data_collector import TrainingDataCollector, COLUMNS, COLUMN_TYPES, list_chunks, iter_chunks
+
+def write_chunk(directory, index, rows, label):
+    rng = np.random.default_rng(index)
+    arrays = {name: np.zeros(rows, dtype=COLUMN_TYPES[name]) for name in COLUMNS}
+    arrays['cpu_usage'] = rng.uniform(0, 100, rows).astype(np.float32)
+    arrays['video_playing'] = (arrays['cpu_usage'] > 50).astype(np.int8) if label is None else np.full(rows, label, dtype=np.int8)
+    np.savez_compressed(os.path.join(directory, f"chunk_{index:05d}.npz"), **arrays)
+
+def test_collector_rotates_chunks(tmp_path):
+    collector = TrainingDataCollector(str(tmp_path), chunk_rows=2)
+    collector.start()
+    pid = os.getpid()
+    for i in range(5):
+        collector.record(float(i), [pid], pid, 3, 1)
+    collector.stop()
+    # The first record only primes the counters, the next four become rows
+    chunks = list(iter_chunks(str(tmp_path)))
+    assert len(chunks) == 2
+    rows = np.concatenate([chunk['pid'] for chunk in chunks])
+    assert rows.tolist() == [pid] * 4
+    assert chunks[0]['foreground'].tolist() == [1, 1]
+    assert chunks[0]['video_playing'].tolist() == [1, 1]
+
+def test_record_drops_when_queue_full(tmp_path):
+    collector = TrainingDataCollector(str(tmp_path), queue_size=1)
+    collector.record(0.0, [], None, 0, 0)
+    collector.record(1.0, [], None, 0, 0)
+    assert collector.dropped == 1
+
+def test_train_over_chunks(tmp_path):
+    pytest.importorskip("sklearn")
+    pytest.importorskip("joblib")
+    from src.ml_model import train
+    write_chunk(str(tmp_path), 0, 100, 0)
+    write_chunk(str(tmp_path), 1, 100, None)
+    write_chunk(str(tmp_path), 2, 100, None)
+    write_chunk(str(tmp_path), 3, 100, None)
+    model = train(str(tmp_path), str(tmp_path / "model.pkl"), str(tmp_path / "model.npz"), trees_per_chunk=3)
+    assert model.n_estimators == 6
+    assert len(list_chunks(str(tmp_path))) == 4
+    assert os.path.exists(tmp_path / "model.npz")
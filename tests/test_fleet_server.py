@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import zlib
+import pytest
+from src.fleet_server import FleetServer, FleetStore, MAX_FRAME_SIZE, decode_payload, is_loopback
+from src.fleet_client import FleetUploader, request
+
+@pytest.fixture
+def server(tmp_path):
+    yield from run_server(tmp_path)
+
+@pytest.fixture
+def token_server(tmp_path):
+    yield from run_server(tmp_path, token="s3cret")
+
+def run_server(tmp_path, token=None):
+    # Run a real server on an ephemeral port in a background event loop
+    loop = asyncio.new_event_loop()
+    fleet_server = FleetServer(FleetStore(str(tmp_path / "fleet.db")), queue_size=2, token=token)
+    port = loop.run_until_complete(fleet_server.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield ("127.0.0.1", port)
+    asyncio.run_coroutine_threadsafe(fleet_server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def test_duplicate_batches_are_applied_once(server):
+    batch = {"host": "ws1", "seq": 1, "records": [["2026-10-19", "Browsing", "chrome", "Docs", 30.0]]}
+    assert request(server, batch) == {"ack": 1, "duplicate": False}
+    assert request(server, batch) == {"ack": 1, "duplicate": True}
+    response = request(server, {"query": "top_apps", "start": "2026-10-19", "end": "2026-10-19"})
+    assert response["results"] == [["chrome", 30.0]]
+
+def test_top_apps_across_hosts(server):
+    request(server, {"host": "ws1", "seq": 1, "records": [["2026-10-19", "Other", "code", "a.py", 10.0]]})
+    request(server, {"host": "ws2", "seq": 1, "records": [["2026-10-19", "Other", "code", "b.py", 15.0],
+                                                         ["2026-10-20", "Browsing", "firefox", "News", 20.0]]})
+    response = request(server, {"query": "top_apps", "start": "2026-10-19", "end": "2026-10-20", "limit": 1})
+    assert response["results"] == [["code", 25.0]]
+    assert request(server, {"query": "last_seq", "host": "ws2"})["results"] == 1
+
+def test_uploader_retries_same_sequence(server, tmp_path):
+    state_file = str(tmp_path / "state.json")
+    uploader = FleetUploader(("127.0.0.1", 1), "ws1", state_file)  # Nothing listens on port 1
+    uploader.add("Other", "code", "a.py", 5.0)
+    assert not uploader.upload()
+    # A restarted uploader resends the persisted batch with its original sequence number
+    uploader = FleetUploader(server, "ws1", state_file)
+    uploader.add("Other", "code", "a.py", 7.0)
+    assert uploader.upload()
+    assert uploader.unacked is None and uploader.seq == 1
+    assert uploader.upload()
+    assert uploader.seq == 2
+    response = request(server, {"query": "top_apps", "start": "0000", "end": "9999"})
+    assert response["results"] == [["code", 12.0]]
+
+def test_decompression_is_bounded():
+    bomb = zlib.compress(b"[" + b" " * (1024 * 1024) + b"]")
+    assert len(bomb) < MAX_FRAME_SIZE
+    with pytest.raises(ValueError):
+        decode_payload(bomb, max_size=64 * 1024)
+    assert decode_payload(zlib.compress(b'{"ok": 1}')) == {"ok": 1}
+    with pytest.raises(ValueError):
+        decode_payload(zlib.compress(b'{"ok": 1}') + b"junk")
+
+def test_token_is_required_when_configured(token_server):
+    batch = {"host": "ws1", "seq": 1, "records": [["2026-10-19", "Other", "code", "a.py", 10.0]]}
+    assert request(token_server, batch) == {"error": "unauthorized"}
+    assert request(token_server, batch, token="wrong") == {"error": "unauthorized"}
+    assert request(token_server, batch, token="s3cret") == {"ack": 1, "duplicate": False}
+    assert is_loopback("127.0.0.1") and is_loopback("localhost") and not is_loopback("0.0.0.0")
+
+def test_lost_state_resyncs_with_the_server(server, tmp_path):
+    for seq in (1, 2, 3):
+        request(server, {"host": "ws1", "seq": seq, "records": [["2026-10-19", "Other", "code", "a.py", 1.0]]})
+    uploader = FleetUploader(server, "ws1", str(tmp_path / "missing.json"))
+    uploader.add("Other", "code", "a.py", 7.0)
+    assert uploader.upload()
+    assert uploader.seq == 4
+    response = request(server, {"query": "top_apps", "start": "0000", "end": "9999"})
+    assert response["results"] == [["code", 10.0]]
+
+def test_pending_time_survives_a_failed_final_upload(server, tmp_path):
+    state_file = str(tmp_path / "state.json")
+    uploader = FleetUploader(("127.0.0.1", 1), "ws1", state_file)
+    uploader.add("Other", "code", "a.py", 5.0)
+    assert not uploader.upload()  # Batch 1 is left unacknowledged
+    uploader.add("Other", "code", "a.py", 7.0)  # Not in any batch yet
+    uploader.stop()
+    uploader = FleetUploader(server, "ws1", state_file)
+    uploader.stop()  # Sends batch 1, then a batch for the pending time
+    assert uploader.unacked is None and not uploader.pending and uploader.seq == 2
+    response = request(server, {"query": "top_apps", "start": "0000", "end": "9999"})
+    assert response["results"] == [["code", 12.0]]
@@ -0,0 +1,61 @@
+import json
+import os
+from src.history_merge import iter_history, merge_files, flatten, import_to_store, file_key
+from src.fleet_server import FleetStore
+
+def write(path, history):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=1)
+
+def test_stream_matches_json_load(tmp_path):
+    history = {
+        "Browsers": {"chrome": {"Inbox": 12.5, "Docs {1}": 3}, "firefox": {}},
+        "Other": {"notepad": {"notes.txt \"draft\"": 120}},
+        "Empty": {}
+    }
+    path = str(tmp_path / "history.json")
+    write(path, history)
+    streamed = {}
+    for category, app, window_times in iter_history(path, chunk_size=7):
+        streamed.setdefault(category, {})[app] = window_times
+    streamed.setdefault("Empty", {})
+    assert streamed == history
+
+def test_merge_across_hosts_and_days(tmp_path):
+    paths = [str(tmp_path / "alpha" / "history-2026-10-01.json"),
+             str(tmp_path / "alpha" / "history-2026-10-02.json"),
+             str(tmp_path / "beta" / "history-2026-10-01.json")]
+    for path in paths:
+        write(path, {"Browsers": {"chrome": {"Inbox": 10}}})
+    partials, errors = merge_files(paths, workers=2)
+    assert errors == []
+    assert set(partials) == {("alpha", "2026-10-01"), ("alpha", "2026-10-02"), ("beta", "2026-10-01")}
+    assert flatten(partials) == {"Browsers": {"chrome": {"Inbox": 30}}}
+
+
+def test_import_applies_each_file_once(tmp_path):
+    paths = [str(tmp_path / "alpha" / "history-2026-10-01.json"),
+             str(tmp_path / "beta" / "history-2026-10-01.json")]
+    for path in paths:
+        write(path, {"Browsers": {"chrome": {"Inbox": 10}}})
+    store = FleetStore(":memory:")
+    store.apply_batch("alpha", 3, [])  # alpha's live uploader is at sequence 3
+    partials, _ = merge_files(paths, workers=2, by_file=True)
+    assert import_to_store(partials, store) == 2
+    assert import_to_store(merge_files(paths, workers=1, by_file=True)[0], store) == 0
+    assert store.top_apps("2026-10-01", "2026-10-01") == [("chrome", 20)]
+    # The import takes no upload sequence numbers, so the uploader's next batch still applies
+    assert store.last_seq("alpha") == 3
+    assert store.apply_batch("alpha", 4, [("2026-10-01", "Browsers", "chrome", "Inbox", 1)])
+
+def test_broken_file_is_reported(tmp_path):
+    good, bad = str(tmp_path / "a" / "good.json"), str(tmp_path / "a" / "bad.json")
+    write(good, {"Other": {"notepad": {"x": 5}}})
+    with open(bad, "w") as f:
+        # The first app parses before the file breaks off; none of it may be counted
+        f.write('{"Other": {"notepad": {"x": 7}, "calc": {"y": 3')
+    partials, errors = merge_files([good, bad], workers=1, host="h")
+    assert [path for path, _ in errors] == [bad]
+    assert file_key(good, "h")[0] == "h"
+    assert flatten(partials) == {"Other": {"notepad": {"x": 5}}}
@@ -0,0 +1,53 @@
+import os
+import psutil
+from unittest.mock import patch, MagicMock
+from src.process_resolver import ProcessResolver
+
+def make_process(create_time=100.0, exe=os.path.join("Apps", "editor.exe")):
+    process = MagicMock()
+    process.create_time.return_value = create_time
+    process.exe.return_value = exe
+    return process
+
+def test_window_fast_path_skips_process_table():
+    resolver = ProcessResolver()
+    with patch('psutil.Process', return_value=make_process()) as mock_process:
+        identity = resolver.resolve(42, hwnd=7)
+        assert identity.friendly_name == "editor"
+        assert resolver.resolve(42, hwnd=7) is identity
+        assert mock_process.call_count == 1
+
+def test_pid_reuse_resolves_again():
+    resolver = ProcessResolver()
+    with patch('psutil.Process', return_value=make_process(100.0, os.path.join("Apps", "a.exe"))):
+        assert resolver.resolve(42).friendly_name == "a"
+    with patch('psutil.Process', return_value=make_process(200.0, os.path.join("Apps", "b.exe"))):
+        assert resolver.resolve(42).friendly_name == "b"
+
+def test_access_denied_is_cached():
+    resolver = ProcessResolver()
+    process = make_process()
+    process.exe.side_effect = psutil.AccessDenied(42)
+    process.name.return_value = "secure.exe"
+    with patch('psutil.Process', return_value=process):
+        assert resolver.resolve(42).exe_path is None
+        assert resolver.resolve(42).friendly_name == "secure"
+        assert process.exe.call_count == 1
+
+def test_unreadable_process_is_cached_briefly():
+    resolver = ProcessResolver(failure_ttl=5.0)
+    with patch('psutil.Process', side_effect=psutil.AccessDenied(42)) as mock_process, \
+         patch('time.monotonic', return_value=1000.0):
+        assert resolver.resolve(42, hwnd=7) is None
+        assert resolver.resolve(42, hwnd=7) is None
+        assert mock_process.call_count == 1
+    with patch('psutil.Process', return_value=make_process()), patch('time.monotonic', return_value=1006.0):
+        assert resolver.resolve(42).friendly_name == "editor"
+
+def test_cache_is_bounded_and_version_info_optional():
+    resolver = ProcessResolver(max_entries=2, version_info=lambda path: ("Editor", "1.2.3.4"))
+    for pid in range(3):
+        with patch('psutil.Process', return_value=make_process(float(pid))):
+            identity = resolver.resolve(pid, hwnd=pid)
+    assert len(resolver.entries) == 2
+    assert (identity.description, identity.version) == ("Editor", "1.2.3.4")
@@ -0,0 +1,121 @@
+from collections import namedtuple
+from contextlib import nullcontext
+from unittest.mock import patch
+import psutil
+from src.process_tree import ProcessTree
+
+CpuTimes = namedtuple("CpuTimes", ["user", "system"])
+IoCounters = namedtuple("IoCounters", ["read_bytes", "write_bytes"])
+
+class FakeProcess:
+    # Minimal psutil.Process backed by a shared table: pid -> dict(ppid, create_time, cpu, io)
+    table = {}
+
+    def __init__(self, pid):
+        if pid not in self.table:
+            raise psutil.NoSuchProcess(pid)
+        self.pid = pid
+        self.started = self.table[pid]["create_time"]  # psutil caches this to tell reused PIDs apart
+
+    def is_running(self):
+        return self.pid in self.table and self.table[self.pid]["create_time"] == self.started
+
+    def oneshot(self):
+        return nullcontext()
+
+    def ppid(self):
+        if self.table[self.pid].get("denied"):
+            raise psutil.AccessDenied(self.pid)
+        return self.table[self.pid]["ppid"]
+
+    def create_time(self):
+        return self.table[self.pid]["create_time"]
+
+    def cpu_times(self):
+        if self.pid not in self.table:
+            raise psutil.NoSuchProcess(self.pid)
+        return CpuTimes(self.table[self.pid]["cpu"], 0.0)
+
+    def io_counters(self):
+        return IoCounters(self.table[self.pid]["io"], 0)
+
+def run(tree, roots, now, **kwargs):
+    with patch("psutil.pids", lambda: list(FakeProcess.table)), \
+         patch("psutil.Process", FakeProcess), patch("time.time", return_value=now):
+        return tree.usage(roots, **kwargs)
+
+def test_helpers_roll_up_to_their_app():
+    FakeProcess.table = {
+        1: {"ppid": 0, "create_time": 1.0, "cpu": 0.0, "io": 0},
+        10: {"ppid": 1, "create_time": 5.0, "cpu": 1.0, "io": 100},   # browser
+        11: {"ppid": 10, "create_time": 6.0, "cpu": 1.0, "io": 100},  # renderer
+        12: {"ppid": 11, "create_time": 7.0, "cpu": 1.0, "io": 100},  # GPU helper
+        20: {"ppid": 1, "create_time": 5.0, "cpu": 1.0, "io": 0},     # editor
+    }
+    tree = ProcessTree(refresh_interval=0)
+    assert run(tree, [10, 20], 100.0) == {}  # First sight only primes
+    for pid in (10, 11, 12):
+        FakeProcess.table[pid]["cpu"] += 0.5
+        FakeProcess.table[pid]["io"] += 1000
+    usage = run(tree, [10, 20], 101.0)
+    assert usage[10].processes == 3
+    assert round(usage[10].cpu_percent) == 150
+    assert usage[10].io_rate == 3000
+    assert usage[20].cpu_percent == 0
+
+def test_index_follows_process_table_deltas():
+    FakeProcess.table = {
+        10: {"ppid": 1, "create_time": 5.0, "cpu": 0.0, "io": 0},
+        11: {"ppid": 10, "create_time": 6.0, "cpu": 0.0, "io": 0},
+    }
+    tree = ProcessTree(refresh_interval=0)
+    run(tree, [10], 100.0)
+    # Helper exits, a new one starts and a reused PID claims a parent that started after it
+    del FakeProcess.table[11]
+    FakeProcess.table[13] = {"ppid": 10, "create_time": 8.0, "cpu": 0.0, "io": 0}
+    FakeProcess.table[14] = {"ppid": 10, "create_time": 1.0, "cpu": 0.0, "io": 0}
+    run(tree, [10], 101.0)
+    assert sorted(tree.descendants(10)) == [10, 13]
+    assert tree.parents[14] is None
+    del FakeProcess.table[10]
+    assert run(tree, [10], 102.0) == {}
+    assert tree.parents[13] is None
+
+def test_nested_app_is_not_counted_twice():
+    FakeProcess.table = {
+        1: {"ppid": 0, "create_time": 1.0, "cpu": 0.0, "io": 0},   # shell
+        2: {"ppid": 1, "create_time": 2.0, "cpu": 0.0, "io": 0},   # app launched from the shell
+    }
+    tree = ProcessTree(refresh_interval=0)
+    with patch("psutil.pids", lambda: list(FakeProcess.table)), patch("psutil.Process", FakeProcess):
+        tree.refresh()
+    assert tree.owned([1, 2]) == {1: [1], 2: [2]}
+    assert tree.owned([1]) == {1: [1, 2]}
+    assert tree.owned([1], exclude=(2,)) == {1: [1]}
+
+def test_unreadable_process_is_indexed_once():
+    FakeProcess.table = {
+        4: {"ppid": 0, "create_time": 1.0, "cpu": 0.0, "io": 0, "denied": True},
+        10: {"ppid": 4, "create_time": 5.0, "cpu": 0.0, "io": 0},
+    }
+    tree = ProcessTree(refresh_interval=60)
+    run(tree, [4], 100.0)
+    assert tree.parents[4] is None and tree.parents[10] is None
+    with patch.object(tree, "refresh", side_effect=AssertionError("refreshed again")):
+        run(tree, [4], 101.0)
+
+def test_reused_pid_is_indexed_again():
+    FakeProcess.table = {
+        10: {"ppid": 1, "create_time": 5.0, "cpu": 0.0, "io": 0},
+        11: {"ppid": 10, "create_time": 6.0, "cpu": 0.0, "io": 0},
+        20: {"ppid": 1, "create_time": 5.0, "cpu": 0.0, "io": 0},
+    }
+    tree = ProcessTree(refresh_interval=60)
+    run(tree, [10], 100.0)
+    # The helper exits between refreshes and an unrelated process gets its PID
+    FakeProcess.table[11] = {"ppid": 20, "create_time": 9.0, "cpu": 50.0, "io": 0}
+    run(tree, [10], 101.0)
+    assert 11 not in tree.parents
+    run(tree, [10], 102.0)
+    assert tree.parents[11] == 20
+    assert tree.descendants(10) == [10]
@@ -0,0 +1,103 @@
+import json
+import http.client
+import concurrent.futures
+import urllib.request
+import urllib.error
+import pytest
+from src.query_api import QueryService, QueryApiServer
+
+JOURNAL = [
+    (1, 100.0, "Browsing", "chrome", "Docs", 5.0),
+    (2, 200.0, "Development", "code", "a.py", 7.0),
+    (3, 300.0, "Browsing", "chrome", "News", 1.0)
+]
+APPS = {"Browsing": {"chrome": {"Docs": 5.0, "News": 1.0}}, "Development": {"code": {"a.py": 7.0}}}
+
+@pytest.fixture
+def api(tmp_path):
+    history_file = tmp_path / "history.json"
+    history_file.write_text(json.dumps({"Other": {"Taskmgr": {"Task Manager": 2.5}}}))
+    service = QueryService(lambda: (3, APPS), lambda since: (0, [e for e in JOURNAL if e[0] > since]), str(history_file))
+    server = QueryApiServer(service, 0)
+    server.start()
+    yield f"http://127.0.0.1:{server.port}"
+    server.stop()
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+    def start(live_state, journal_since):
+        server = QueryApiServer(QueryService(live_state, journal_since, str(tmp_path / "history.json")), 0)
+        server.start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.port}"
+    yield start
+    for server in servers:
+        server.stop()
+
+def get(url, etag=None):
+    request = urllib.request.Request(url, headers={"If-None-Match": etag} if etag else {})
+    with urllib.request.urlopen(request) as response:
+        return response.headers.get("ETag"), response.read().decode("utf-8")
+
+def test_apps_paginated(api):
+    etag, body = get(f"{api}/apps?limit=1&offset=1")
+    page = json.loads(body)
+    assert page["total"] == 2
+    assert page["items"] == [{"category": "Development", "app": "code", "seconds": 7.0}]
+    assert etag == '"live-3"'
+
+def test_not_modified_when_sequence_unchanged(api):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f"{api}/summary", etag='"live-3"')
+    assert error.value.code == 304
+
+def test_top_over_time_range(api):
+    _, body = get(f"{api}/top?n=1&start=150&end=400")
+    assert json.loads(body)["items"] == [{"app": "code", "seconds": 7.0}]
+
+def test_changes_since_sequence_streams_ndjson(api):
+    _, body = get(f"{api}/changes?since=1")
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [row["sequence"] for row in rows] == [2, 3]
+
+def test_history_stream_and_etag(api):
+    etag, body = get(f"{api}/history")
+    assert json.loads(body.strip()) == {"category": "Other", "app": "Taskmgr", "window": "Task Manager", "seconds": 2.5}
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f"{api}/history", etag=etag)
+    assert error.value.code == 304
+
+def test_changes_gone_once_dropped_from_journal(serve):
+    # Sequences 1 and 2 were pushed out; a client at 0 or 1 would silently miss entries
+    url = serve(lambda: (3, APPS), lambda since: (2, [e for e in JOURNAL if e[0] > max(since, 2)]))
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f"{url}/changes?since=1")
+    assert error.value.code == 410
+    _, body = get(f"{url}/changes?since=2")
+    assert [json.loads(line)["sequence"] for line in body.splitlines()] == [3]
+
+def test_foreign_host_header_is_rejected(api):
+    port = int(api.rsplit(":", 1)[1])
+    for host, status in [("evil.example", 403), ("localhost:%d" % port, 200)]:
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        connection.request("GET", "/summary", headers={"Host": host})
+        assert connection.getresponse().status == status
+        connection.close()
+
+def test_busy_tracker_is_unavailable(serve):
+    def busy():
+        raise concurrent.futures.TimeoutError()
+    url = serve(busy, lambda since: busy())
+    for path in ("/summary", "/changes"):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get(url + path)
+        assert error.value.code == 503
+
+def test_legacy_app_entries_are_skipped(serve):
+    apps = {"Other": {"notepad": {"x": 5.0}, "legacy": 12}}
+    url = serve(lambda: (1, apps), lambda since: (0, []))
+    _, body = get(f"{url}/summary")
+    assert json.loads(body)["categories"] == {"Other": {"notepad": 5.0}}
+    _, body = get(f"{url}/top")
+    assert json.loads(body)["items"] == [{"app": "notepad", "seconds": 5.0}]
@@ -0,0 +1,31 @@
+import threading
+import time
+from src.sampling_profiler import SamplingProfiler
+
+def busy_worker(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+def test_collects_collapsed_stacks(tmp_path):
+    output = tmp_path / "profile.collapsed"
+    stop_event = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop_event,), name="tracker")
+    worker.start()
+    profiler = SamplingProfiler(str(output), interval=0.001, thread_names={"tracker"})
+    profiler.start()
+    time.sleep(0.1)
+    assert profiler.stop() == str(output)
+    stop_event.set()
+    worker.join()
+    lines = output.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.startswith("tracker;")
+    assert "busy_worker" in stack
+    assert int(count) > 0
+    assert not profiler.running
+
+def test_stop_without_start_is_noop(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path / "profile.collapsed"))
+    assert profiler.stop() is None
+    assert not (tmp_path / "profile.collapsed").exists()
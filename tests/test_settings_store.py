@@ -0,0 +1,56 @@
+import os
+import json
+import time
+import threading
+from src.settings_store import SettingsStore
+
+def test_subscribers_receive_only_changed_keys(tmp_path):
+    store = SettingsStore(str(tmp_path / "settings.json"), {"cpu_threshold": 10, "inactivity_timeout": 5})
+    received = []
+    store.subscribe(received.append, ["cpu_threshold"])
+    store.update({"cpu_threshold": 10, "inactivity_timeout": 20})
+    store.update({"cpu_threshold": 15})
+    assert received == [{"cpu_threshold": 15}]
+    assert store["inactivity_timeout"] == 20
+
+def test_rapid_updates_coalesce_into_one_write(tmp_path):
+    path = tmp_path / "settings.json"
+    store = SettingsStore(str(path), {"cpu_threshold": 10}, write_delay=0.05)
+    for value in range(11, 40):
+        store["cpu_threshold"] = value
+    time.sleep(0.3)
+    assert store.writes == 1
+    assert json.loads(path.read_text()) == {"cpu_threshold": 39}
+    assert not (tmp_path / "settings.json.tmp").exists()
+
+def test_reset_writes_immediately(tmp_path):
+    path = tmp_path / "settings.json"
+    store = SettingsStore(str(path), {"cpu_threshold": 50})
+    received = []
+    store.subscribe(received.append)
+    store.reset({"cpu_threshold": 10, "hourly_wage": 10})
+    assert received == [{"cpu_threshold": 10, "hourly_wage": 10}]
+    assert json.loads(path.read_text()) == {"cpu_threshold": 10, "hourly_wage": 10}
+
+def test_two_writers_do_not_share_a_temp_file(tmp_path):
+    # The GUI and the collector daemon each hold a store for the same file
+    path = str(tmp_path / "settings.json")
+    stores = [SettingsStore(path, {"n": 0}) for _ in range(2)]
+    def write(store):
+        for i in range(50):
+            store.update({"n": i})
+            store.flush()
+    threads = [threading.Thread(target=write, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(store.writes > 0 for store in stores)
+    with open(path) as f:
+        assert json.load(f) == {"n": 49}
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+def test_write_failure_is_reported(tmp_path):
+    store = SettingsStore(str(tmp_path / "missing" / "settings.json"), {"a": 1})
+    assert store.flush() is False
+    assert store.get("a") == 1
@@ -0,0 +1,18 @@
+import json
+import pytest
+from src.state_snapshot import EMPTY, freeze, thaw, replace_app
+
+def test_replace_app_shares_unchanged_mappings():
+    apps = freeze({"Browsing": {"chrome": {"Inbox": 10}}, "Office": {"word": {"Report": 5}}})
+    updated = replace_app(apps, "Browsing", "chrome", {"Inbox": 11})
+    assert updated["Office"] is apps["Office"]
+    assert apps["Browsing"]["chrome"]["Inbox"] == 10  # The old snapshot is untouched
+    assert updated["Browsing"]["chrome"]["Inbox"] == 11
+    added = replace_app(EMPTY, "Other", "notepad", {"notes": 1})
+    assert thaw(added) == {"Other": {"notepad": {"notes": 1}}}
+
+def test_snapshots_are_read_only_and_serializable():
+    apps = freeze({"Browsing": {"chrome": {"Inbox": 10}}})
+    with pytest.raises(TypeError):
+        apps["Browsing"]["chrome"]["Inbox"] = 0
+    assert json.loads(json.dumps(apps, default=dict)) == {"Browsing": {"chrome": {"Inbox": 10}}}
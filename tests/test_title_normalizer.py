@@ -0,0 +1,57 @@
+from src.title_normalizer import TitleNormalizer, TitleCap, HeavyHitters, OTHER_WINDOWS
+
+def test_normalize_strips_counters_and_markers():
+    normalizer = TitleNormalizer()
+    assert normalizer.normalize("(3) Inbox - Outlook") == "Inbox - Outlook"
+    assert normalizer.normalize("● file.py - Visual Studio Code") == "file.py - Visual Studio Code"
+    assert normalizer.normalize("Team Chat [12]") == "Team Chat"
+    assert normalizer.normalize("(12)") == "(12)"  # Never normalize a title away entirely
+
+def test_invalid_rule_is_skipped(caplog):
+    normalizer = TitleNormalizer(rules=[(r"(unclosed", ""), ["x"], (r"\s*\[\d+\]$", "")])
+    assert len(normalizer.rules) == 1
+    assert normalizer.normalize("Chat [2]") == "Chat"
+    assert "(unclosed" in caplog.text
+
+def test_normalize_cache_is_bounded():
+    normalizer = TitleNormalizer(rules=[(r"\d+", "#")], cache_size=2)
+    for title in ["a1", "b2", "c3"]:
+        normalizer.normalize(title)
+    assert list(normalizer.cache) == ["b2", "c3"]
+    assert normalizer.normalize("c3") == "c#"
+
+def test_heavy_hitters_replaces_lightest():
+    hitters = HeavyHitters(2)
+    hitters.add("a", 10)
+    hitters.add("b", 1)
+    assert hitters.add("c", 1) == "b"
+    assert hitters.weights == {"a": 10, "c": 2}
+
+def test_title_cap_folds_into_other():
+    cap = TitleCap(2)
+    window_times = {}
+    cap.add("Browsing", "chrome", "Docs", 100, window_times)
+    cap.add("Browsing", "chrome", "Mail", 50, window_times)
+    # A 5 s newcomer does not displace a 50 s title; its time waits in the shared bucket
+    assert cap.add("Browsing", "chrome", "News", 5, window_times) == []
+    assert window_times == {"Docs": 100, "Mail": 50, OTHER_WINDOWS: 5}
+    assert cap.add("Browsing", "chrome", "News", 40, window_times) == []
+    folded = cap.add("Browsing", "chrome", "News", 10, window_times)
+    assert folded == ["Mail"]
+    assert window_times == {"Docs": 100, "News": 55, OTHER_WINDOWS: 50}
+    assert sum(window_times.values()) == 205
+
+def test_title_cap_promotes_only_on_real_time():
+    cap = TitleCap(1)
+    window_times = {"Docs": 30}
+    # Candidates churn through the one-slot summary; inherited estimates never count as real time
+    for title in ["a", "b", "c", "d"]:
+        assert cap.add("Browsing", "chrome", title, 20, window_times) == []
+    assert window_times == {"Docs": 30, OTHER_WINDOWS: 80}
+
+def test_title_cap_seeds_from_loaded_history():
+    cap = TitleCap(1)
+    window_times = {"Docs": 100, "Mail": 50}
+    folded = cap.add("Browsing", "chrome", "Docs", 1, window_times)
+    assert folded == ["Mail"]
+    assert window_times == {"Docs": 101, OTHER_WINDOWS: 50}
@@ -0,0 +1,115 @@
+import time
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pythoncom = pytest.importorskip("pythoncom")  # The tracker core drives win32 APIs
+
+from src.tracker_core import TrackerCore
+from src.app_tracker_utils import app_tracker_utils
+from src.config import settings
+
+@pytest.fixture
+def core(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(settings.values, "deep_idle_heartbeat", 0.05)
+    monkeypatch.setattr(app_tracker_utils, "inactivity_timeout", 10)
+    return TrackerCore()
+
+async def start(core):
+    # The parts of run() that enter_deep_idle relies on
+    core.loop = asyncio.get_running_loop()
+    core.stop_event, core.wake_event, core.awake_event = asyncio.Event(), asyncio.Event(), asyncio.Event()
+    core.awake_event.set()
+    core.executor = ThreadPoolExecutor(max_workers=1)
+
+def test_heartbeat_detection_is_not_undone_by_a_stale_check(core, monkeypatch):
+    monkeypatch.setattr(app_tracker_utils, "last_active_time", time.time() - 1000)
+    monkeypatch.setattr(app_tracker_utils, "is_application_active", lambda pid, is_foreground: True)
+
+    async def scenario():
+        await start(core)
+        stale = core.loop.create_future()
+        stale.set_result(False)  # Pre-idle check: nothing was playing
+        core.scoring_future, core.scoring_started_inactive, core.scored_while_inactive = stale, True, True
+        assert core.should_deep_idle(42)
+        await asyncio.wait_for(core.enter_deep_idle(42), 2)
+        core.executor.shutdown()
+
+    asyncio.run(scenario())
+    assert core.passive_activity
+    assert core.scoring_future is None  # The stale False result can no longer be harvested
+    assert not core.should_deep_idle(42)
+    assert core.awake_event.is_set() and not core.deep_idle
+
+def test_input_just_before_idling_wakes_at_once(core, monkeypatch):
+    monkeypatch.setitem(settings.values, "deep_idle_heartbeat", 300)
+    monkeypatch.setattr(app_tracker_utils, "last_active_time", time.time())  # notify_input saw deep_idle False
+
+    async def scenario():
+        await start(core)
+        await asyncio.wait_for(core.enter_deep_idle(42), 2)
+        core.executor.shutdown()
+
+    asyncio.run(scenario())
+    assert app_tracker_utils.user_active and not core.deep_idle
+
+def test_failed_loop_is_logged_and_restarted(core, monkeypatch):
+    calls = []
+    async def flaky_loop():
+        calls.append(time.time())
+        if len(calls) == 1:
+            raise RuntimeError("window vanished")
+        core.running = False
+    monkeypatch.setattr(core, "sleep", lambda seconds: asyncio.sleep(0))
+
+    asyncio.run(core.keep_running(flaky_loop))
+    assert len(calls) == 2
+    assert any("window vanished" in line for line in app_tracker_utils.debug_logs)
+
+def test_file_watcher_closes_its_handle_after_the_last_wait(core, monkeypatch):
+    events = []
+    monkeypatch.setattr(app_tracker_utils, "open_change_notification", lambda directory: "handle")
+    def wait_for_change(handle, timeout_ms):
+        events.append("wait")
+        time.sleep(0.01)
+        return False
+    monkeypatch.setattr(app_tracker_utils, "wait_for_change", wait_for_change)
+    monkeypatch.setattr(app_tracker_utils, "close_change_notification", lambda handle: events.append("close"))
+    watcher = threading.Thread(target=core.watch_files, args=(".",))
+    watcher.start()
+    time.sleep(0.05)
+    core.stop()
+    watcher.join(2)
+    assert not watcher.is_alive()
+    assert events[-1] == "close" and events.count("close") == 1
+
+def test_ended_session_stays_in_history(core):
+    async def scenario():
+        await start(core)
+        core.add_elapsed("Other", "app", "win", 100.0)
+        apps = core.snapshot.apps
+        core.reset_state()
+        await core.save_session(apps)
+        # save_loop only writes when the sequence moved on; the cleared state must not count
+        assert core.snapshot.sequence == core.last_saved_sequence
+        core.executor.shutdown()
+
+    asyncio.run(scenario())
+    with open("history.json") as f:
+        assert json.load(f) == {"Other": {"app": {"win": 100.0}}}
+
+def test_stopping_keeps_the_session_in_history(core):
+    # In-process End Session: the core stops and its final save holds everything tracked
+    async def scenario():
+        await start(core)
+        pythoncom.CoInitialize()  # Balanced by shutdown()
+        core.add_elapsed("Other", "app", "win", 100.0)
+        core.stop()
+        await core.shutdown()
+
+    asyncio.run(scenario())
+    with open("history.json") as f:
+        assert json.load(f) == {"Other": {"app": {"win": 100.0}}}
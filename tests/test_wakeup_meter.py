@@ -0,0 +1,16 @@
+from src import wakeup_meter
+from src.wakeup_meter import WakeupMeter
+
+def test_rates_are_per_state(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(wakeup_meter.time, "monotonic", lambda: now[0])
+    meter = WakeupMeter()
+    for _ in range(10):
+        meter.wakeup()
+    now[0] = 36.0
+    meter.enter("deep_idle")
+    meter.wakeup()
+    now[0] = 36.0 + 3600
+    rates = meter.rates()
+    assert rates["active"] == 1000.0
+    assert rates["deep_idle"] == 1.0
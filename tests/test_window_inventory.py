@@ -0,0 +1,36 @@
+from src.window_inventory import WindowInventory
+
+def test_refresh_reports_only_changes():
+    windows = [(1, 100, "Inbox"), (2, 200, "Editor")]
+    inventory = WindowInventory(lambda: windows)
+    opened, closed, retitled = inventory.refresh()
+    assert sorted(opened) == [(1, 100, "Inbox"), (2, 200, "Editor")]
+    assert inventory.refresh() == ([], [], [])
+
+    windows = [(1, 100, "Inbox (1)"), (3, 200, "Terminal")]
+    opened, closed, retitled = inventory.refresh()
+    assert opened == [(3, 200, "Terminal")]
+    assert closed == [(2, 200, "Editor")]
+    assert retitled == [(1, 100, "Inbox", "Inbox (1)")]
+
+def test_queries_by_pid():
+    windows = [(1, 100, "Inbox"), (2, 100, "Compose"), (3, 200, "Editor")]
+    inventory = WindowInventory(lambda: windows)
+    inventory.refresh()
+    assert inventory.has_windows(100) and inventory.has_windows(200)
+    windows = [(2, 100, "Compose"), (3, 200, "Editor")]
+    inventory.refresh()
+    assert inventory.has_windows(100)  # One of its two windows is still open
+    windows = [(3, 200, "Editor")]
+    inventory.refresh()
+    assert not inventory.has_windows(100)
+
+def test_reused_handle_counts_as_close_and_open():
+    windows = [(1, 100, "Old")]
+    inventory = WindowInventory(lambda: windows)
+    inventory.refresh()
+    windows = [(1, 300, "New")]
+    opened, closed, retitled = inventory.refresh()
+    assert opened == [(1, 300, "New")]
+    assert closed == [(1, 100, "Old")]
+    assert inventory.has_windows(300) and not inventory.has_windows(100)